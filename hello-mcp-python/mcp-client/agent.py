@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from client import HelloClient
+from ollama_client import ChatResponse, Message, OllamaClient, ToolCall
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+class AgentStep:
+    """一次 LLM 调用或工具调用的耗时记录"""
+
+    def __init__(self, turn: int, kind: str, name: str, offset: float, duration: float):
+        self.turn = turn
+        # "llm" 或 "tool"
+        self.kind = kind
+        self.name = name
+        # 相对智能体开始运行的时刻（秒）
+        self.offset = offset
+        self.duration = duration
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "turn": self.turn,
+            "kind": self.kind,
+            "name": self.name,
+            "offset": self.offset,
+            "duration": self.duration,
+        }
+
+
+class AgentResult:
+    """智能体运行结果"""
+
+    def __init__(
+        self,
+        answer: str,
+        stop_reason: str,
+        turns: int,
+        steps: List[AgentStep],
+        messages: List[Message],
+        elapsed: float,
+    ):
+        self.answer = answer
+        # "completed"：模型不再调用工具；"max_turns"/"time_budget"：预算耗尽
+        self.stop_reason = stop_reason
+        self.turns = turns
+        self.steps = steps
+        self.messages = messages
+        self.elapsed = elapsed
+
+
+class AgentLoop:
+    """
+    多轮智能体循环
+
+    每轮调用一次 LLM，并发执行该轮返回的所有工具调用，把结果加入消息历史后进入下一轮，
+    直到模型不再调用工具，或轮数、时间预算耗尽。
+    传入以 ``async with`` 打开的 HelloClient 时，所有工具调用共享其连接池中的会话。
+    不传 ``tools`` 时，每轮从 HelloClient 的工具目录缓存读取工具定义，缓存失效后自动重新拉取。
+    设置 ``on_delta`` 时，LLM 以流式方式生成，内容增量到达即回调。
+    """
+
+    def __init__(
+        self,
+        ollama_client: OllamaClient,
+        hello_client: HelloClient,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        max_turns: int = 5,
+        time_budget: float = 120.0,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ):
+        self.ollama_client = ollama_client
+        self.hello_client = hello_client
+        self.tools = tools
+        self.max_turns = max_turns
+        self.time_budget = time_budget
+        self.on_delta = on_delta
+
+    async def run(self, query: Union[str, List[Message]]) -> AgentResult:
+        """运行智能体直到得到最终答案或预算耗尽"""
+        messages = [Message("user", query)] if isinstance(query, str) else list(query)
+        steps: List[AgentStep] = []
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        last_response: Optional[ChatResponse] = None
+        stop_reason = "max_turns"
+        turn = 0
+
+        while turn < self.max_turns:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                stop_reason = "time_budget"
+                break
+            turn += 1
+
+            step_start = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(self._chat(messages), remaining)
+            except asyncio.TimeoutError:
+                stop_reason = "time_budget"
+                break
+            finally:
+                duration = time.perf_counter() - step_start
+                steps.append(AgentStep(turn, "llm", self.ollama_client.model, step_start - start, duration))
+            last_response = response
+            messages.append(Message("assistant", response.content, tool_calls=response.tool_calls))
+
+            if not response.has_tool_calls():
+                stop_reason = "completed"
+                break
+
+            logger.info(f"第 {turn} 轮: 并发执行 {len(response.tool_calls)} 个工具调用")
+            try:
+                results = await asyncio.wait_for(
+                    asyncio.gather(
+                        *(self._execute_tool_call(turn, tool_call, start, steps) for tool_call in response.tool_calls)
+                    ),
+                    deadline - time.perf_counter(),
+                )
+            except asyncio.TimeoutError:
+                stop_reason = "time_budget"
+                break
+
+            # 按工具调用的原始顺序写回结果
+            for tool_call, result in zip(response.tool_calls, results):
+                messages.append(Message("tool", result, tool_name=tool_call.name))
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"智能体结束: {stop_reason}, 共 {turn} 轮, 耗时 {elapsed:.3f}s")
+        return AgentResult(
+            answer=last_response.content if last_response else "",
+            stop_reason=stop_reason,
+            turns=turn,
+            steps=steps,
+            messages=messages,
+            elapsed=elapsed,
+        )
+
+    async def _chat(self, messages: List[Message]) -> ChatResponse:
+        tools = self.tools if self.tools is not None else await self.hello_client.get_ollama_tools()
+        if self.on_delta is None:
+            return await self.ollama_client.chat(messages, tools)
+        chat_stream = self.ollama_client.chat_stream(messages, tools)
+        async for delta in chat_stream:
+            self.on_delta(delta)
+        return chat_stream.response
+
+    async def _execute_tool_call(
+        self,
+        turn: int,
+        tool_call: ToolCall,
+        start: float,
+        steps: List[AgentStep],
+    ) -> str:
+        step_start = time.perf_counter()
+        try:
+            return await self.ollama_client.execute_tool_call(tool_call, self.hello_client)
+        finally:
+            duration = time.perf_counter() - step_start
+            steps.append(AgentStep(turn, "tool", tool_call.name, step_start - start, duration))
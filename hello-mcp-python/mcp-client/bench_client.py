@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import mcp.types as types
+
+from client import HelloClient
+from lookup_cache import LookupCache
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# 压测时随机查询的元素名称
+ELEMENT_NAMES = [
+    "氢", "氦", "锂", "碳", "氮", "氧", "钠", "铝", "硅",
+    "硫", "氯", "铁", "铜", "锌", "银", "金", "汞", "铀",
+]
+
+DEFAULT_MIX = "get_element=4,get_element_by_position=4,get_elements=1,list_tools=1"
+
+Operation = Callable[[HelloClient], Awaitable[Any]]
+
+# 工具调用返回原始 CallToolResult，isError 的结果同样计为错误
+OPERATIONS: Dict[str, Operation] = {
+    "get_element": lambda client: client.call_tool("get_element", {"name": random.choice(ELEMENT_NAMES)}),
+    "get_element_by_position": lambda client: client.call_tool(
+        "get_element_by_position", {"position": random.randint(1, 118)}
+    ),
+    "get_elements": lambda client: client.call_tool("get_elements", {"queries": random.sample(range(1, 119), 10)}),
+    "list_tools": lambda client: client.list_tools(),
+}
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    """解析工具配比，如 "get_element=4,list_tools=1" """
+    weights: Dict[str, int] = {}
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"未知操作: {name}，可选: {', '.join(OPERATIONS)}")
+        weights[name] = int(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("工具配比的权重之和必须大于 0")
+    return weights
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """最近秩法计算分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class BenchResult:
+    """按操作汇总的压测结果"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, operation: str, seconds: float, error: bool) -> None:
+        self.latencies.setdefault(operation, []).append(seconds)
+        if error:
+            self.errors[operation] = self.errors.get(operation, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        rows: Dict[str, Dict[str, float]] = {}
+        everything: List[float] = []
+        for operation, latencies in sorted(self.latencies.items()):
+            rows[operation] = self._row(latencies, self.errors.get(operation, 0), elapsed)
+            everything.extend(latencies)
+        rows["total"] = self._row(everything, sum(self.errors.values()), elapsed)
+        return rows
+
+    @staticmethod
+    def _row(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+        ordered = sorted(latencies)
+        count = len(ordered)
+        return {
+            "requests": count,
+            "errors": errors,
+            "error_rate": errors / count if count else 0.0,
+            "rps": count / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p90_ms": percentile(ordered, 0.90) * 1000,
+            "p99_ms": percentile(ordered, 0.99) * 1000,
+            "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+        }
+
+
+def format_table(rows: Dict[str, Dict[str, float]]) -> str:
+    header = f"{'operation':<26}{'requests':>10}{'errors':>8}{'err%':>8}{'rps':>10}" \
+             f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    lines = [header, "-" * len(header)]
+    for operation, row in rows.items():
+        lines.append(
+            f"{operation:<26}{row['requests']:>10}{row['errors']:>8}{row['error_rate'] * 100:>7.2f}%"
+            f"{row['rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p90_ms']:>10.2f}"
+            f"{row['p99_ms']:>10.2f}{row['max_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+async def run_bench(
+    client: HelloClient,
+    concurrency: int,
+    duration: float,
+    rps: float,
+    weights: Dict[str, int],
+) -> Dict[str, Dict[str, float]]:
+    """
+    以固定并发驱动服务端，直到时长用完
+
+    指定 rps 时按固定间隔排队发出请求，延迟从计划发送时刻开始计算，
+    这样服务端变慢导致的排队时间也计入延迟，避免协调遗漏（coordinated omission）。
+    """
+    names = list(weights)
+    cumulative = []
+    total = 0
+    for name in names:
+        total += weights[name]
+        cumulative.append(total)
+
+    result = BenchResult()
+    interval = 1.0 / rps if rps > 0 else 0.0
+    start = time.perf_counter()
+    deadline = start + duration
+    next_slot = start
+
+    async def worker() -> None:
+        nonlocal next_slot
+        while True:
+            if interval:
+                scheduled = next_slot
+                next_slot += interval
+                if scheduled >= deadline:
+                    return
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= deadline:
+                    return
+            operation = random.choices(names, cum_weights=cumulative)[0]
+            error = False
+            try:
+                outcome = await OPERATIONS[operation](client)
+            except Exception as e:
+                error = True
+                logger.debug(f"{operation} 失败: {e}")
+            else:
+                if isinstance(outcome, types.CallToolResult) and outcome.isError:
+                    error = True
+                    logger.debug(f"{operation} 返回错误: {outcome.content[0].text if outcome.content else ''}")
+            result.record(operation, time.perf_counter() - scheduled, error)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return result.summary(time.perf_counter() - start)
+
+
+async def bench(args: argparse.Namespace) -> Dict[str, Any]:
+    weights = parse_mix(args.mix)
+    cache = LookupCache(max_entries=args.lookup_cache) if args.lookup_cache else None
+    client = HelloClient(
+        base_url=f"http://localhost:{args.port}", pool_size=args.concurrency, cache=cache, uds=args.uds
+    )
+    if args.reuse_session:
+        async with client:
+            rows = await run_bench(client, args.concurrency, args.duration, args.rps, weights)
+    else:
+        rows = await run_bench(client, args.concurrency, args.duration, args.rps, weights)
+    report = {
+        "label": args.label,
+        "config": {
+            "port": args.port,
+            "uds": args.uds,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "rps": args.rps,
+            "mix": weights,
+            "reuse_session": args.reuse_session,
+            "lookup_cache": args.lookup_cache,
+        },
+        "results": rows,
+    }
+    if cache is not None:
+        report["lookup_cache"] = cache.stats.to_dict()
+    return report
+
+
+def main():
+    """Entry point for the load-generation benchmark"""
+    parser = argparse.ArgumentParser(description="MCP Server Benchmark")
+    parser.add_argument("--port", type=int, default=9900, help="Port to connect to MCP server (default: 9900)")
+    parser.add_argument("--uds", default=None, help="Connect through this Unix domain socket instead of TCP")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent workers (default: 8)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Benchmark duration in seconds (default: 10)")
+    parser.add_argument("--rps", type=float, default=0.0, help="Target requests per second, 0 for unlimited")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted tool mix (default: {DEFAULT_MIX})")
+    parser.add_argument(
+        "--reuse-session",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse pooled MCP sessions (default) or open a new session per call",
+    )
+    parser.add_argument(
+        "--lookup-cache",
+        type=int,
+        default=0,
+        metavar="SIZE",
+        help="Cache up to SIZE single-element lookups on the client and coalesce concurrent duplicates (0 disables)",
+    )
+    parser.add_argument(
+        "--label",
+        default="",
+        help="Name of the configuration under test, e.g. 'sse' or 'json-response'",
+    )
+    parser.add_argument("--json-output", default=None, help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.lookup_cache < 0:
+        parser.error("--lookup-cache must not be negative")
+
+    # 逐次调用的 INFO 日志会干扰压测结果
+    logging.getLogger("client").setLevel(logging.WARNING)
+
+    logger.info(
+        f"压测 MCP 服务器: http://localhost:{args.port}, 并发 {args.concurrency}, 时长 {args.duration}s, "
+        f"目标 RPS {args.rps or '不限'}, 复用会话 {args.reuse_session}"
+    )
+    report = asyncio.run(bench(args))
+
+    title = f" ({report['label']})" if report["label"] else ""
+    print(f"\n压测结果{title}:\n{format_table(report['results'])}\n")
+    if "lookup_cache" in report:
+        stats = report["lookup_cache"]
+        print(
+            f"客户端查询缓存: 命中 {stats['hits']}，合并 {stats['coalesced']}，未命中 {stats['misses']}，"
+            f"命中率 {stats['hit_rate']:.1%}\n"
+        )
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"JSON 报告已写入 {args.json_output}")
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,26 @@
 import asyncio
+import contextlib
+import json
 import logging
+import sys
+import time
+from datetime import timedelta
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, Dict, List, Optional, Sequence, Set, TypeVar, Union
 
+import anyio
+import httpx
+import mcp.types as types
+from anyio.abc import TaskGroup
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from pydantic import AnyUrl
+
+from lookup_cache import LookupCache
+
+if sys.version_info < (3, 11):
+    from exceptiongroup import BaseExceptionGroup
 
 # Configure logging
 logging.basicConfig(
@@ -11,70 +29,404 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# 服务端整张元素表资源的 URI
+TABLE_URI = "periodic-table://elements"
+
+# 经由查询缓存的单元素查询工具 -> 作为缓存键的参数名
+CACHED_TOOLS = {"get_element": "name", "get_element_by_position": "position"}
+
+
+class _PooledSession:
+    """连接池中的一个已初始化会话，由后台任务持有其传输层上下文"""
+
+    __slots__ = ("session", "closed", "dead", "users")
+
+    def __init__(self, session: ClientSession, closed: anyio.Event):
+        self.session = session
+        self.closed = closed
+        # 传输层已退出，会话不能再使用
+        self.dead = False
+        # 正在使用该会话的调用，传输层退出时取消它们，避免永远等不到响应
+        self.users: Set[anyio.CancelScope] = set()
+
+    def mark_dead(self) -> None:
+        self.dead = True
+        self.closed.set()
+        for scope in self.users:
+            scope.cancel()
+
+
+class SessionLostError(Exception):
+    """连接池中的会话在请求进行中失效（传输层出错或被关闭）"""
+
+
+# 服务端返回 404 或传输层断开时，SDK 以这些消息结束进行中的请求
+_LOST_SESSION_MESSAGES = ("Session terminated", "Connection closed")
+
+
+def _is_session_lost(error: BaseException) -> bool:
+    """会话过期或传输层断开，换一个新会话重试即可"""
+    if isinstance(error, BaseExceptionGroup):
+        return all(_is_session_lost(inner) for inner in error.exceptions)
+    if isinstance(error, McpError):
+        return error.error.message in _LOST_SESSION_MESSAGES
+    return isinstance(error, (SessionLostError, anyio.BrokenResourceError, anyio.ClosedResourceError))
+
+
+def _to_ollama_tool(tool: types.Tool) -> Dict[str, Any]:
+    """把 MCP 工具定义转换为 Ollama 的 function 格式"""
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.inputSchema,
+        },
+    }
+
 
 class HelloClient:
     """
     HelloClient类
-    
+
     此类负责创建与MCP服务器的连接，用于调用元素周期表相关的工具。
     使用 HTTP 客户端连接到 StreamableHTTP 服务端。
+
+    直接调用方法时，每次调用都会新建并关闭一个会话；
+    作为异步上下文管理器使用时（``async with HelloClient(...) as client``），
+    会维护一个最多 ``pool_size`` 个已初始化会话的连接池，
+    在多次调用和并发协程之间复用，会话过期或传输层断开时自动重连。
+    每个请求最多等待 ``read_timeout`` 秒的响应（None 表示不限）。
+
+    工具目录（以及转换后的 Ollama 工具定义）会被缓存，
+    收到 ``notifications/tools/list_changed`` 通知或超过 ``tool_cache_ttl`` 秒后失效。
+    通知只能经由打开着的会话送达，因此一次性会话模式下只依靠 TTL 失效。
+
+    指定 ``uds`` 时通过该 Unix 域套接字连接服务端（``mcp-server --uds``），``base_url`` 只用于拼出请求路径和 Host 头。
+
+    传入 ``cache``（LookupCache）后，get_element 和 get_element_by_position 的结果会被缓存，
+    并发的相同查询只发出一次请求，命中统计见 ``cache.stats``。
     """
 
-    def __init__(self, base_url: str = "http://localhost:9900"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:9900",
+        pool_size: int = 4,
+        tool_cache_ttl: Optional[float] = 300.0,
+        cache: Optional[LookupCache[types.CallToolResult]] = None,
+        uds: Optional[str] = None,
+        read_timeout: Optional[float] = 60.0,
+    ):
+        if pool_size < 1:
+            raise ValueError("pool_size 必须大于 0")
         self.base_url = base_url
         self.endpoint = f"{base_url}/mcp/"
+        self.pool_size = pool_size
+        self.tool_cache_ttl = tool_cache_ttl
+        self.cache = cache
+        self.uds = uds
+        self.read_timeout = timedelta(seconds=read_timeout) if read_timeout is not None else None
+        self._task_group: Optional[TaskGroup] = None
+        self._slots: Optional[anyio.Semaphore] = None
+        self._idle: List[_PooledSession] = []
+        self._tools: Optional[List[types.Tool]] = None
+        self._ollama_tools: Optional[List[Dict[str, Any]]] = None
+        self._tools_fetched_at = 0.0
+        # 每次失效加一，避免失效前发出的 tools/list 结果覆盖缓存
+        self._tools_generation = 0
 
-    async def list_tools(self) -> str:
-        """列举所有可用工具"""
-        async with streamablehttp_client(self.endpoint) as (
+    async def __aenter__(self) -> "HelloClient":
+        if self._task_group is not None:
+            raise RuntimeError("HelloClient 连接池已经打开")
+        self._slots = anyio.Semaphore(self.pool_size)
+        self._task_group = anyio.create_task_group()
+        await self._task_group.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> Optional[bool]:
+        task_group = self._task_group
+        if task_group is None:
+            return None
+        self._discard_idle()
+        try:
+            return await task_group.__aexit__(exc_type, exc_value, traceback)
+        finally:
+            self._task_group = None
+            self._slots = None
+
+    def _create_http_client(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[httpx.Timeout] = None,
+        auth: Optional[httpx.Auth] = None,
+    ) -> httpx.AsyncClient:
+        """经由 Unix 域套接字发送请求的 httpx 客户端，其余设置与 SDK 默认的一致"""
+        return httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=self.uds),
+            headers=headers,
+            timeout=timeout or httpx.Timeout(30.0, read=300.0),
+            auth=auth,
+            follow_redirects=True,
+        )
+
+    def _connect(self):
+        """建立一次 streamable HTTP 连接"""
+        if self.uds is None:
+            return streamablehttp_client(self.endpoint)
+        return streamablehttp_client(self.endpoint, httpx_client_factory=self._create_http_client)
+
+    async def _handle_message(self, message: Any) -> None:
+        """处理服务端推送的消息，工具列表变化时清空工具目录缓存"""
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            logger.info("收到 tools/list_changed 通知，清空工具目录缓存")
+            self.invalidate_tools()
+
+    def invalidate_tools(self) -> None:
+        """清空工具目录缓存"""
+        self._tools = None
+        self._ollama_tools = None
+        self._tools_generation += 1
+
+    def _discard_idle(self) -> None:
+        """关闭所有空闲会话"""
+        for pooled in self._idle:
+            pooled.closed.set()
+        self._idle.clear()
+
+    async def _run_session(self, *, task_status=anyio.TASK_STATUS_IGNORED) -> None:
+        """在后台任务中持有一个会话，直到它被关闭或传输层出错"""
+        closed = anyio.Event()
+        pooled: Optional[_PooledSession] = None
+        try:
+            async with self._connect() as (
+                read_stream,
+                write_stream,
+                _,
+            ):
+                async with ClientSession(
+                    read_stream,
+                    write_stream,
+                    read_timeout_seconds=self.read_timeout,
+                    message_handler=self._handle_message,
+                ) as session:
+                    await session.initialize()
+                    pooled = _PooledSession(session, closed)
+                    task_status.started(pooled)
+                    await closed.wait()
+        except Exception as e:
+            if pooled is None:
+                raise
+            logger.warning(f"MCP 会话的传输层出错: {e}")
+        finally:
+            if pooled is not None:
+                # 传输层已经退出：从空闲列表移除，并让仍在等待响应的调用立即失败
+                pooled.mark_dead()
+                if pooled in self._idle:
+                    self._idle.remove(pooled)
+
+    @contextlib.asynccontextmanager
+    async def _session(self) -> AsyncIterator[ClientSession]:
+        """新建并初始化一个一次性会话，退出时关闭"""
+        async with self._connect() as (
             read_stream,
             write_stream,
             _,
         ):
-            async with ClientSession(read_stream, write_stream) as session:
+            async with ClientSession(
+                read_stream,
+                write_stream,
+                read_timeout_seconds=self.read_timeout,
+                message_handler=self._handle_message,
+            ) as session:
                 await session.initialize()
-                result = await session.list_tools()
+                yield session
+
+    @contextlib.asynccontextmanager
+    async def _pooled(self, fresh: bool = False) -> AsyncIterator[_PooledSession]:
+        """借出池中的一个空闲会话（fresh 为真或没有空闲会话时新建），用完后归还"""
+        async with self._slots:
+            if self._idle and not fresh:
+                pooled = self._idle.pop()
+            else:
+                pooled = await self._task_group.start(self._run_session)
+            try:
+                yield pooled
+            except BaseException:
+                # 出错的会话状态未知，直接丢弃
+                pooled.closed.set()
+                raise
+            if self._task_group is not None and not pooled.dead:
+                self._idle.append(pooled)
+            else:
+                pooled.closed.set()
 
-                tools_list = []
-                for tool in result.tools:
-                    tools_list.append(
-                        f"工具名称: {tool.name}, 描述: {tool.description}"
-                    )
+    async def _call(self, operation: Callable[[ClientSession], Awaitable[T]], fresh: bool = False) -> T:
+        """在一个会话上执行请求；池中会话的传输层在请求进行中退出时抛出 SessionLostError"""
+        if self._task_group is None or self._slots is None:
+            async with self._session() as session:
+                return await operation(session)
 
-                tools_str = "\n".join(tools_list)
-                logger.info(f"列举工具成功:\n{tools_str}")
-                return tools_str
+        async with self._pooled(fresh=fresh) as pooled:
+            with anyio.CancelScope() as scope:
+                pooled.users.add(scope)
+                try:
+                    return await operation(pooled.session)
+                finally:
+                    pooled.users.discard(scope)
+            # 只有 mark_dead 会取消这个 scope
+            raise SessionLostError("MCP 会话的传输层已关闭")
+
+    async def _request(self, operation: Callable[[ClientSession], Awaitable[T]]) -> T:
+        """在会话上执行一次请求，连接池模式下会话过期或传输层断开时重连重试一次"""
+        try:
+            return await self._call(operation)
+        except Exception as e:
+            if self._task_group is None or not _is_session_lost(e):
+                raise
+            logger.info(f"MCP 会话已失效（{e!r}），重新建立会话")
+            # 同一批建立的空闲会话很可能也已失效，一并丢弃
+            self._discard_idle()
+        return await self._call(operation, fresh=True)
+
+    async def _fetch_tools(self) -> List[types.Tool]:
+        """从服务端拉取工具目录并刷新缓存"""
+        generation = self._tools_generation
+        result = await self._request(lambda session: session.list_tools())
+        if generation == self._tools_generation:
+            self._tools = result.tools
+            self._ollama_tools = None
+            self._tools_fetched_at = time.monotonic()
+        return result.tools
+
+    async def get_tools(self) -> List[types.Tool]:
+        """获取工具目录，缓存有效时不访问服务端"""
+        tools = self._tools
+        if tools is not None and (
+            self.tool_cache_ttl is None or time.monotonic() - self._tools_fetched_at < self.tool_cache_ttl
+        ):
+            return tools
+        return await self._fetch_tools()
+
+    async def get_ollama_tools(self) -> List[Dict[str, Any]]:
+        """获取 Ollama function 格式的工具定义，与工具目录一起缓存"""
+        tools = await self.get_tools()
+        ollama_tools = self._ollama_tools
+        if ollama_tools is None or self._tools is not tools:
+            ollama_tools = [_to_ollama_tool(tool) for tool in tools]
+            if self._tools is tools:
+                self._ollama_tools = ollama_tools
+        return ollama_tools
+
+    async def list_tools(self) -> str:
+        """列举所有可用工具（总是访问服务端，并刷新工具目录缓存）"""
+        tools = await self._fetch_tools()
+
+        tools_list = []
+        for tool in tools:
+            tools_list.append(
+                f"工具名称: {tool.name}, 描述: {tool.description}"
+            )
+
+        tools_str = "\n".join(tools_list)
+        logger.info(f"列举工具成功:\n{tools_str}")
+        return tools_str
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> types.CallToolResult:
+        """
+        调用工具并返回原始结果，工具执行失败时结果的 isError 为 True，调用方自行检查
+
+        get_element 和 get_element_by_position 配置了查询缓存时经由缓存加载。
+        """
+
+        async def load() -> types.CallToolResult:
+            return await self._request(lambda session: session.call_tool(name, arguments=arguments))
+
+        argument = CACHED_TOOLS.get(name)
+        if self.cache is None or argument is None:
+            return await load()
+        return await self.cache.get_or_load((name, arguments[argument]), load)
 
     async def get_element(self, name: str) -> str:
         """根据元素名称查询元素信息"""
         logger.info(f"查询元素: {name}")
-        async with streamablehttp_client(self.endpoint) as (
-            read_stream,
-            write_stream,
-            _,
-        ):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                result = await session.call_tool("get_element", arguments={"name": name})
+        result = await self.call_tool("get_element", {"name": name})
 
-                content = result.content[0].text if result.content else ""
-                logger.info(f"查询元素 {name} 成功: {content}")
-                return content
+        content = result.content[0].text if result.content else ""
+        logger.info(f"查询元素 {name} 成功: {content}")
+        return content
 
     async def get_element_by_position(self, position: int) -> str:
         """根据原子序数查询元素信息"""
         logger.info(f"查询位置元素: {position}")
-        async with streamablehttp_client(self.endpoint) as (
-            read_stream,
-            write_stream,
-            _,
-        ):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                result = await session.call_tool(
-                    "get_element_by_position", arguments={"position": position}
-                )
+        result = await self.call_tool("get_element_by_position", {"position": position})
+
+        content = result.content[0].text if result.content else ""
+        logger.info(f"查询位置元素 {position} 成功: {content}")
+        return content
+
+    async def get_elements(self, queries: Sequence[Union[str, int]]) -> List[str]:
+        """批量查询元素信息，一次调用返回与输入顺序一致的结果列表（单项失败时为错误信息）"""
+        logger.info(f"批量查询元素: {len(queries)} 项")
+        result = await self._request(
+            lambda session: session.call_tool("get_elements", arguments={"queries": list(queries)})
+        )
+
+        contents = [item.text for item in result.content if item.type == "text"]
+        logger.info(f"批量查询元素成功: {len(contents)} 项")
+        return contents
+
+    async def lookup_elements(self, queries: Sequence[Union[str, int]]) -> List[Optional[Dict[str, Any]]]:
+        """批量查询元素的结构化数据，与输入顺序一致，查不到的项为 None"""
+        logger.info(f"批量查询元素数据: {len(queries)} 项")
+        result = await self._request(
+            lambda session: session.call_tool("get_elements", arguments={"queries": list(queries)})
+        )
+        if result.isError:
+            raise RuntimeError(result.content[0].text if result.content else "")
+        return [item.get("element") for item in result.structuredContent["results"]]
+
+    async def search_elements(self, query: str, limit: int = 5) -> List[str]:
+        """模糊搜索元素（容忍拼写错误，支持不带声调的拼音），按相似度返回结果列表"""
+        logger.info(f"模糊搜索元素: {query}")
+        result = await self._request(
+            lambda session: session.call_tool("search_elements", arguments={"query": query, "limit": limit})
+        )
+
+        contents = [item.text for item in result.content if item.type == "text"]
+        logger.info(f"模糊搜索元素 {query} 成功: {len(contents)} 项")
+        return contents
+
+    async def query_elements(self, **filters: Any) -> Dict[str, Any]:
+        """
+        按条件过滤元素，参数与 query_elements 工具一致，
+        如 ``query_elements(group="VIIA", fields=["symbol", "name"])``
+
+        Returns:
+            包含 total、offset、count 和 elements 的字典
+        """
+        logger.info(f"过滤查询元素: {filters}")
+        result = await self._request(lambda session: session.call_tool("query_elements", arguments=filters))
+
+        if result.isError:
+            raise RuntimeError(result.content[0].text if result.content else "")
+        data = result.structuredContent
+        logger.info(f"过滤查询元素成功: 共 {data['total']} 项，返回 {data['count']} 项")
+        return data
+
+    async def read_periodic_table(self) -> Dict[str, Any]:
+        """
+        读取整张元素表资源，一次请求拿到全部元素，之后可以在本地查找
 
-                content = result.content[0].text if result.content else ""
-                logger.info(f"查询位置元素 {position} 成功: {content}")
-                return content
+        Returns:
+            包含 version 和 elements（与 lookup_elements 单项格式相同的字典列表）的字典
+        """
+        result = await self._request(lambda session: session.read_resource(AnyUrl(TABLE_URI)))
+        data = json.loads(result.contents[0].text)
+        fields = data["fields"]
+        elements = [dict(zip(fields, row)) for row in data["rows"]]
+        logger.info(f"读取元素表成功: 版本 {data['version']}，共 {len(elements)} 项")
+        return {"version": data["version"], "elements": elements}
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import logging
+import shlex
+import time
+from typing import Dict, List, Optional
+
+from mcp import ClientSession
+from mcp.client.stdio import StdioServerParameters, stdio_client
+
+from bench_client import percentile
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMAND = "mcp-server --transport stdio --log-level WARNING"
+
+STAGES = ("initialize", "first_call")
+
+
+async def measure_once(params: StdioServerParameters) -> Dict[str, float]:
+    """
+    启动一次 stdio 服务端子进程，返回从启动到各阶段完成的秒数
+
+    initialize：收到 initialize 响应，即解释器启动、模块导入和握手都已完成；
+    first_call：收到第一个 tools/call 的响应。
+    """
+    start = time.perf_counter()
+    async with stdio_client(params) as (read_stream, write_stream):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            initialized = time.perf_counter()
+            result = await session.call_tool("get_element", arguments={"name": "铁"})
+            called = time.perf_counter()
+            if result.isError:
+                raise RuntimeError(result.content[0].text if result.content else "")
+    return {"initialize": initialized - start, "first_call": called - start}
+
+
+async def measure(params: StdioServerParameters, runs: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    """多次冷启动，汇总各阶段的 min/p50/p90/max（毫秒）"""
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    for run in range(warmup + runs):
+        timings = await measure_once(params)
+        # 预热让字节码缓存和操作系统页缓存就绪，不计入结果
+        if run < warmup:
+            continue
+        for stage in STAGES:
+            samples[stage].append(timings[stage])
+    summary: Dict[str, Dict[str, float]] = {}
+    for stage, values in samples.items():
+        ordered = sorted(values)
+        summary[stage] = {
+            "min_ms": ordered[0] * 1000,
+            "p50_ms": percentile(ordered, 0.50) * 1000,
+            "p90_ms": percentile(ordered, 0.90) * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+    return summary
+
+
+def format_table(summary: Dict[str, Dict[str, float]]) -> str:
+    header = f"{'stage':<14}{'min ms':>10}{'p50 ms':>10}{'p90 ms':>10}{'max ms':>10}"
+    lines = [header, "-" * len(header)]
+    for stage, row in summary.items():
+        lines.append(
+            f"{stage:<14}{row['min_ms']:>10.1f}{row['p50_ms']:>10.1f}{row['p90_ms']:>10.1f}{row['max_ms']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    """Entry point for the stdio cold-start measurement"""
+    parser = argparse.ArgumentParser(description="MCP stdio server cold-start measurement")
+    parser.add_argument(
+        "--command",
+        default=DEFAULT_COMMAND,
+        help=f"Command that starts the server on stdio (default: {DEFAULT_COMMAND!r})",
+    )
+    parser.add_argument("--cwd", default=None, help="Working directory for the server process")
+    parser.add_argument("--runs", type=int, default=20, help="Measured cold starts (default: 20)")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured cold starts before measuring (default: 2)")
+    parser.add_argument("--json-output", default=None, help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    command: List[str] = shlex.split(args.command)
+    cwd: Optional[str] = args.cwd
+    params = StdioServerParameters(command=command[0], args=command[1:], cwd=cwd)
+
+    logger.info(f"测量冷启动: {args.command}, {args.runs} 次（预热 {args.warmup} 次）")
+    summary = asyncio.run(measure(params, args.runs, args.warmup))
+    report = {"command": args.command, "runs": args.runs, "results": summary}
+
+    print(f"\n冷启动耗时（从启动子进程开始计时）:\n{format_table(summary)}\n")
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"JSON 报告已写入 {args.json_output}")
+    else:
+        print(json.dumps(report, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 每写入这么多条记录检查一次磁盘缓存是否超出上限
+_PRUNE_INTERVAL = 64
+
+
+class CacheStats:
+    """缓存命中统计"""
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class LlmResponseCache:
+    """
+    LLM 响应的精确匹配缓存
+
+    以模型、消息和工具定义的稳定哈希为键。内存中是一层 LRU，
+    指定 ``path`` 时再加一层 SQLite 持久化存储，进程重启后仍可命中。
+    两层各自有条目数上限，``ttl`` 秒后条目过期（None 表示不过期）。
+    两层都保存序列化后的 JSON 文本，每次命中都解码出新的字典，调用方修改返回值不会影响缓存。
+    磁盘层每写入若干条才裁剪一次，条目数可能短暂超过上限。
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: int = 1024,
+        max_disk_entries: int = 100_000,
+        ttl: Optional[float] = 24 * 3600,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        # key -> (写入时间, 响应的 JSON 文本)
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        if path:
+            self._db = sqlite3.connect(path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_responses_created_at ON llm_responses (created_at)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]) -> str:
+        """根据模型、消息和工具定义计算稳定的缓存键"""
+        payload = json.dumps(
+            {"model": model, "messages": messages, "tools": tools},
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at >= self.ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查找缓存的响应，先查内存再查磁盘"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if not self._expired(entry[0], now):
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return json.loads(entry[1])
+            del self._memory[key]
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and not self._expired(row[1], now):
+                self._remember(key, row[1], row[0])
+                self.stats.disk_hits += 1
+                return json.loads(row[0])
+
+        self.stats.misses += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """写入两层缓存"""
+        now = time.time()
+        text = json.dumps(value, ensure_ascii=False)
+        self._remember(key, now, text)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, value, created_at) VALUES (?, ?, ?)",
+                (key, text, now),
+            )
+            self._writes += 1
+            if self._writes % _PRUNE_INTERVAL == 0:
+                self._prune_disk(now)
+            self._db.commit()
+
+    def _remember(self, key: str, created_at: float, text: str) -> None:
+        self._memory[key] = (created_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self, now: float) -> None:
+        """删除过期条目，并把磁盘缓存裁剪到条目数上限（先删最旧的）"""
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM llm_responses WHERE key IN ("
+            "SELECT key FROM llm_responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def clear(self) -> None:
+        """清空两层缓存"""
+        self._memory.clear()
+        if self._db is not None:
+            self._db.execute("DELETE FROM llm_responses")
+            self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
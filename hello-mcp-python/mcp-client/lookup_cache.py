@@ -0,0 +1,128 @@
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+
+import anyio
+
+T = TypeVar("T")
+
+
+class LookupCacheStats:
+    """查询缓存的命中统计"""
+
+    def __init__(self):
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @property
+    def requests(self) -> int:
+        return self.hits + self.coalesced + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        """不需要单独访问服务端的查询比例，合并到进行中请求的也算命中"""
+        total = self.requests
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class _Flight(Generic[T]):
+    """一次进行中的加载，后到的相同查询等待它完成"""
+
+    __slots__ = ("done", "value", "error", "succeeded")
+
+    def __init__(self):
+        self.done = anyio.Event()
+        self.value: Optional[T] = None
+        self.error: Optional[BaseException] = None
+        self.succeeded = False
+
+
+class LookupCache(Generic[T]):
+    """
+    客户端查询结果的内存缓存
+
+    条目数超过 ``max_entries`` 时淘汰最久未使用的，``ttl`` 秒后过期（None 表示不过期）。
+    同一个键同时只有一次加载在进行（single-flight）：并发的相同查询等待这次加载并共享结果，
+    加载失败时异常传给所有等待者，失败结果不会写入缓存。
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 300.0):
+        if max_entries < 1:
+            raise ValueError("max_entries 必须大于 0")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = LookupCacheStats()
+        # key -> (写入时间, 结果)
+        self._entries: "OrderedDict[Hashable, Tuple[float, T]]" = OrderedDict()
+        self._flights: Dict[Hashable, _Flight[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Optional[T]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if self.ttl is not None and time.monotonic() - entry[0] >= self.ttl:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[1]
+
+    def put(self, key: Hashable, value: T) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        """返回缓存的结果；没有时调用 loader 加载，并发的相同键只加载一次"""
+        while True:
+            found, value = self._lookup(key)
+            if found:
+                self.stats.hits += 1
+                return value
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            await flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.succeeded:
+                self.stats.coalesced += 1
+                return flight.value
+            # 发起加载的协程被取消了，重新查找或由本协程加载
+
+        flight = self._flights[key] = _Flight()
+        self.stats.misses += 1
+        try:
+            value = await loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            flight.succeeded = True
+            self.put(key, value)
+            return value
+        finally:
+            del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """删除一个键，不指定时清空缓存；进行中的加载不受影响"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
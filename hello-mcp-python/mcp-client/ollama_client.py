@@ -1,11 +1,13 @@
 import asyncio
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 
 from client import HelloClient
+from llm_cache import LlmResponseCache
 
 # Configure logging
 logging.basicConfig(
@@ -15,17 +17,6 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class Message:
-    """消息类"""
-
-    def __init__(self, role: str, content: str):
-        self.role = role
-        self.content = content
-
-    def to_dict(self) -> Dict[str, str]:
-        return {"role": self.role, "content": self.content}
-
-
 class ToolCall:
     """工具调用类"""
 
@@ -33,6 +24,34 @@ class ToolCall:
         self.name = name
         self.arguments = arguments
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {"function": {"name": self.name, "arguments": self.arguments}}
+
+
+class Message:
+    """消息类"""
+
+    def __init__(
+        self,
+        role: str,
+        content: str,
+        tool_calls: Optional[List[ToolCall]] = None,
+        tool_name: Optional[str] = None,
+    ):
+        self.role = role
+        self.content = content
+        # assistant 消息携带本轮发起的工具调用，tool 消息标明结果来自哪个工具
+        self.tool_calls = tool_calls or []
+        self.tool_name = tool_name
+
+    def to_dict(self) -> Dict[str, Any]:
+        message: Dict[str, Any] = {"role": self.role, "content": self.content}
+        if self.tool_calls:
+            message["tool_calls"] = [tool_call.to_dict() for tool_call in self.tool_calls]
+        if self.tool_name:
+            message["tool_name"] = self.tool_name
+        return message
+
 
 class ChatResponse:
     """聊天响应类"""
@@ -46,39 +65,178 @@ class ChatResponse:
         return len(self.tool_calls) > 0
 
 
+def _parse_tool_calls(message_node: Dict[str, Any]) -> List[ToolCall]:
+    """解析消息中的工具调用"""
+    tool_calls = []
+    for tool_call_node in message_node.get("tool_calls") or []:
+        function_node = tool_call_node.get("function", {})
+        tool_calls.append(
+            ToolCall(
+                name=function_node.get("name", ""),
+                arguments=function_node.get("arguments", {}),
+            )
+        )
+    return tool_calls
+
+
+class ChatStream:
+    """
+    流式聊天响应
+
+    迭代时逐段产出 Ollama 返回的内容增量；工具调用在其所在的分块到达后解析并累积。
+    迭代结束后 ``response`` 为拼装好的完整响应，
+    ``time_to_first_token`` 和 ``tokens_per_second`` 为本次生成的性能数据。
+    """
+
+    def __init__(self, http_client: httpx.AsyncClient, url: str, request_body: Dict[str, Any]):
+        self._http_client = http_client
+        self._url = url
+        self._request_body = request_body
+        self.role = "assistant"
+        self.tool_calls: List[ToolCall] = []
+        self.response: Optional[ChatResponse] = None
+        self.time_to_first_token: Optional[float] = None
+        self.tokens_per_second: Optional[float] = None
+        self.eval_count: Optional[int] = None
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[str]:
+        content_parts: List[str] = []
+        start = time.perf_counter()
+        first_token_at: Optional[float] = None
+
+        async with self._http_client.stream(
+            "POST",
+            self._url,
+            json=self._request_body,
+            headers={"Content-Type": "application/json"},
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                logger.debug(f"响应内容: {response.text}")
+                raise RuntimeError(f"Ollama API 请求失败: {response.status_code}")
+
+            # Ollama 以 NDJSON 返回流式结果，每行一个 JSON 分块
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama 请求失败: {chunk['error']}")
+
+                message_node = chunk.get("message") or {}
+                self.role = message_node.get("role") or self.role
+                content = message_node.get("content")
+                tool_calls = _parse_tool_calls(message_node)
+                if (content or tool_calls) and first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    self.time_to_first_token = first_token_at - start
+                self.tool_calls.extend(tool_calls)
+                if content:
+                    content_parts.append(content)
+                    yield content
+
+                if chunk.get("done"):
+                    self.eval_count = chunk.get("eval_count")
+                    eval_duration = chunk.get("eval_duration")
+                    # eval_duration 单位为纳秒，只统计生成阶段
+                    if self.eval_count and eval_duration:
+                        self.tokens_per_second = self.eval_count / (eval_duration / 1e9)
+                    break
+
+        # 服务端没有返回统计信息时，按首个分块之后收到的内容分块数估算
+        if self.tokens_per_second is None and first_token_at is not None:
+            elapsed = time.perf_counter() - first_token_at
+            if elapsed > 0:
+                self.tokens_per_second = len(content_parts) / elapsed
+
+        self.response = ChatResponse(role=self.role, content="".join(content_parts), tool_calls=self.tool_calls)
+        logger.info(
+            f"流式响应完成: 首个 token {self.time_to_first_token or 0:.3f}s, "
+            f"{self.tokens_per_second or 0:.1f} tokens/s"
+        )
+
+
 class OllamaClient:
     """
     Ollama 客户端
-    
+
     用于与 Ollama API 交互，支持工具调用
     """
 
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "qwen2.5:latest"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "qwen2.5:latest",
+        cache: Optional[LlmResponseCache] = None,
+    ):
         self.base_url = base_url
         self.model = model
         self.http_client = httpx.AsyncClient(timeout=300.0)
+        # 可选的精确匹配响应缓存，相同的模型、消息和工具定义直接返回缓存的响应
+        self.cache = cache
+
+    def _request_body(self, messages: List[Message], tools: List[Dict[str, Any]], stream: bool) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "stream": stream,
+            "messages": [msg.to_dict() for msg in messages],
+            "tools": tools,
+        }
+
+    def chat_stream(self, messages: List[Message], tools: List[Dict[str, Any]]) -> ChatStream:
+        """
+        发送流式聊天请求
 
-    async def chat(self, messages: List[Message], tools: List[Dict[str, Any]]) -> ChatResponse:
+        Args:
+            messages: 消息列表
+            tools: 可用工具列表
+
+        Returns:
+            ChatStream，用 ``async for`` 迭代内容增量，结束后读取 ``response`` 和性能数据
+        """
+        logger.info(f"发送流式聊天请求到 Ollama: model={self.model}, messages={len(messages)}")
+        return ChatStream(
+            self.http_client,
+            f"{self.base_url}/api/chat",
+            self._request_body(messages, tools, stream=True),
+        )
+
+    async def chat(
+        self,
+        messages: List[Message],
+        tools: List[Dict[str, Any]],
+        use_cache: bool = True,
+    ) -> ChatResponse:
         """
         发送聊天请求
-        
+
         Args:
             messages: 消息列表
             tools: 可用工具列表
-            
+            use_cache: 为 False 时绕过响应缓存，总是请求模型（结果仍会写入缓存）
+
         Returns:
             响应消息
         """
         try:
-            logger.info(f"发送聊天请求到 Ollama: model={self.model}, messages={len(messages)}")
-
             # 构建请求体
-            request_body = {
-                "model": self.model,
-                "stream": False,
-                "messages": [msg.to_dict() for msg in messages],
-                "tools": tools,
-            }
+            request_body = self._request_body(messages, tools, stream=False)
+
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key(self.model, request_body["messages"], tools)
+                if use_cache:
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        logger.info(f"命中 LLM 响应缓存: model={self.model}, messages={len(messages)}")
+                        return self._parse_message(cached)
+                else:
+                    self.cache.stats.bypasses += 1
+
+            logger.info(f"发送聊天请求到 Ollama: model={self.model}, messages={len(messages)}")
 
             logger.debug(f"请求 JSON: {json.dumps(request_body, ensure_ascii=False, indent=2)}")
 
@@ -97,35 +255,33 @@ class OllamaClient:
 
             response_json = response.json()
             message_node = response_json.get("message", {})
+            if cache_key is not None:
+                self.cache.put(cache_key, message_node)
 
-            role = message_node.get("role", "assistant")
-            content = message_node.get("content", "")
-
-            # 解析工具调用
-            tool_calls = []
-            if "tool_calls" in message_node:
-                for tool_call_node in message_node["tool_calls"]:
-                    function_node = tool_call_node.get("function", {})
-                    tool_call = ToolCall(
-                        name=function_node.get("name", ""),
-                        arguments=function_node.get("arguments", {}),
-                    )
-                    tool_calls.append(tool_call)
-
-            return ChatResponse(role=role, content=content, tool_calls=tool_calls)
+            return self._parse_message(message_node)
 
         except Exception as e:
             logger.error(f"Ollama 请求失败: {e}")
-            raise RuntimeError(f"Ollama 请求失败: {e}")
+            raise RuntimeError(f"Ollama 请求失败: {e}") from e
+
+    @staticmethod
+    def _parse_message(message_node: Dict[str, Any]) -> ChatResponse:
+        role = message_node.get("role", "assistant")
+        content = message_node.get("content", "")
+
+        # 解析工具调用
+        tool_calls = _parse_tool_calls(message_node)
+
+        return ChatResponse(role=role, content=content, tool_calls=tool_calls)
 
     async def execute_tool_call(self, tool_call: ToolCall, hello_client: HelloClient) -> str:
         """
         执行工具调用
-        
+
         Args:
             tool_call: 工具调用信息
             hello_client: MCP客户端实例
-            
+
         Returns:
             工具执行结果
         """
@@ -140,6 +296,20 @@ class OllamaClient:
                 if isinstance(position, float):
                     position = int(position)
                 result = await hello_client.get_element_by_position(position)
+            elif tool_call.name == "get_elements":
+                queries = tool_call.arguments.get("queries") or []
+                results = await hello_client.get_elements(queries)
+                result = "\n".join(results)
+            elif tool_call.name == "search_elements":
+                query = tool_call.arguments.get("query", "")
+                limit = tool_call.arguments.get("limit", 5)
+                if isinstance(limit, float):
+                    limit = int(limit)
+                results = await hello_client.search_elements(query, limit)
+                result = "\n".join(results)
+            elif tool_call.name == "query_elements":
+                data = await hello_client.query_elements(**tool_call.arguments)
+                result = json.dumps(data, ensure_ascii=False)
             else:
                 result = json.dumps({"error": f"未知工具: {tool_call.name}"}, ensure_ascii=False)
 
@@ -151,5 +321,7 @@ class OllamaClient:
             return json.dumps({"error": str(e)}, ensure_ascii=False)
 
     async def close(self):
-        """关闭HTTP客户端"""
+        """关闭HTTP客户端和响应缓存"""
         await self.http_client.aclose()
+        if self.cache is not None:
+            self.cache.close()
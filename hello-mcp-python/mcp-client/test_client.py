@@ -36,11 +36,23 @@ async def test_get_element_by_position(port: int):
     print(f"查询原子序数为6的元素结果: {result}\n")
 
 
+async def test_get_elements(port: int):
+    """测试4: 测试MCP工具调用 - 批量查询"""
+    logger.info("=== 测试4: 测试MCP工具调用 - 批量查询 ===")
+    client = HelloClient(base_url=f"http://localhost:{port}")
+    results = await client.get_elements(["氢", "He", "Carbon", 26, "不存在"])
+    print("批量查询结果:")
+    for result in results:
+        print(f"  {result}")
+    print()
+
+
 async def run_all_tests(port: int):
     """运行所有测试用例"""
     await test_list_tools(port)
     await test_get_element_by_name(port)
     await test_get_element_by_position(port)
+    await test_get_elements(port)
 
 
 def main():
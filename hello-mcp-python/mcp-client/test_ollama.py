@@ -1,12 +1,12 @@
 import argparse
 import asyncio
 import logging
+from typing import Optional
 
-from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
-
+from agent import AgentLoop
 from client import HelloClient
-from ollama_client import Message, OllamaClient
+from llm_cache import LlmResponseCache
+from ollama_client import OllamaClient
 
 # Configure logging
 logging.basicConfig(
@@ -16,77 +16,48 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def test_llm_with_mcp_tools(port: int):
+async def test_llm_with_mcp_tools(port: int, stream: bool = False, cache_path: Optional[str] = None):
     """测试 LLM 通过工具调用查询元素"""
-    ollama_client = OllamaClient()
+    cache = LlmResponseCache(cache_path) if cache_path else None
+    ollama_client = OllamaClient(cache=cache)
     hello_client = HelloClient(base_url=f"http://localhost:{port}")
 
     try:
         logger.info("=== 测试: LLM 通过工具调用查询元素 ===")
 
-        # 获取可用工具
-        async with streamablehttp_client(hello_client.endpoint) as (
-            read_stream,
-            write_stream,
-            _,
-        ):
-            async with ClientSession(read_stream, write_stream) as session:
-                await session.initialize()
-                tools_result = await session.list_tools()
-
-                # 转换工具格式为Ollama格式
-                tools = []
-                for tool in tools_result.tools:
-                    tools.append(
-                        {
-                            "type": "function",
-                            "function": {
-                                "name": tool.name,
-                                "description": tool.description,
-                                "parameters": tool.inputSchema,
-                            },
-                        }
-                    )
-
-        # 构建消息
-        messages = []
-        query = "请帮我查询氢元素的详细信息，包括原子序数、符号和相对原子质量"
-        messages.append(Message("user", query))
-
-        # 第一次调用 LLM
-        logger.info(f"第一次调用 LLM: {query}")
-        response = await ollama_client.chat(messages, tools)
-
-        logger.info(f"LLM 响应角色: {response.role}")
-        logger.info(f"LLM 响应内容: {response.content}")
-
-        # 检查是否有工具调用
-        if response.has_tool_calls():
-            logger.info(f"LLM 决定调用工具，工具数量: {len(response.tool_calls)}")
-
-            # 执行工具调用
-            for tool_call in response.tool_calls:
-                logger.info(f"执行工具: {tool_call.name}")
-                logger.info(f"工具参数: {tool_call.arguments}")
-
-                tool_result = await ollama_client.execute_tool_call(tool_call, hello_client)
-                logger.info(f"工具执行结果: {tool_result}")
-
-                # 将工具结果添加到消息历史
-                messages.append(Message("assistant", ""))
-                messages.append(Message("tool", tool_result))
-
-            # 第二次调用 LLM，让其基于工具结果生成最终答案
-            logger.info("第二次调用 LLM，生成最终答案...")
-            final_response = await ollama_client.chat(messages, tools)
-
-            logger.info(f"最终答案: {final_response.content}")
-            print(f"\n最终答案: {final_response.content}\n")
-            logger.info("✅ 测试成功：LLM 成功通过 MCP 工具查询到元素信息")
-
+        # 多轮智能体：每轮并发执行全部工具调用，工具调用共享连接池中的会话
+        query = "请帮我查询氢元素和碳元素的详细信息，包括原子序数、符号和相对原子质量"
+        logger.info(f"调用 LLM: {query}")
+        if stream:
+            print("\n最终答案: ", end="", flush=True)
+        # 工具目录和 Ollama 格式的工具定义由 HelloClient 缓存，各轮不再重复拉取和转换
+        async with hello_client:
+            agent = AgentLoop(
+                ollama_client,
+                hello_client,
+                on_delta=(lambda delta: print(delta, end="", flush=True)) if stream else None,
+            )
+            result = await agent.run(query)
+
+        for step in result.steps:
+            logger.info(
+                f"第 {step.turn} 轮 {step.kind} {step.name}: "
+                f"开始 {step.offset * 1000:.1f}ms, 耗时 {step.duration * 1000:.1f}ms"
+            )
+        tool_steps = [step for step in result.steps if step.kind == "tool"]
+
+        logger.info(f"最终答案: {result.answer}")
+        print(f"\n{'' if stream else '最终答案: ' + result.answer}\n")
+        if tool_steps:
+            logger.info(
+                f"✅ 测试成功：LLM 经过 {result.turns} 轮、{len(tool_steps)} 次 MCP 工具调用得到答案"
+                f"（{result.stop_reason}, 耗时 {result.elapsed:.3f}s）"
+            )
         else:
-            logger.warning(f"LLM 没有调用工具，直接返回了答案: {response.content}")
+            logger.warning(f"LLM 没有调用工具，直接返回了答案: {result.answer}")
             logger.info("这可能是因为 LLM 已经知道答案，或者不支持工具调用")
+        if cache is not None:
+            logger.info(f"LLM 响应缓存统计: {cache.stats.to_dict()}")
 
     except Exception as e:
         logger.error(f"测试失败: {e}")
@@ -108,10 +79,20 @@ def main():
         default=9900,
         help="Port to connect to MCP server (default: 9900)",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream LLM output token by token",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        default=None,
+        help="SQLite file for caching identical LLM requests across runs (streamed turns are not cached)",
+    )
     args = parser.parse_args()
 
     logger.info(f"连接到 MCP 服务器: http://localhost:{args.port}")
-    asyncio.run(test_llm_with_mcp_tools(args.port))
+    asyncio.run(test_llm_with_mcp_tools(args.port, args.stream, args.llm_cache))
 
 
 if __name__ == "__main__":
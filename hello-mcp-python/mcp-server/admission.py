@@ -0,0 +1,216 @@
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+import anyio
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# 每类令牌桶最多保留的键数，超过后淘汰最久未使用的
+MAX_BUCKETS = 10_000
+# 未指定突发容量时，允许的突发请求数为速率的倍数
+DEFAULT_BURST_FACTOR = 2.0
+
+REJECT_REASONS = ("session_rate", "ip_rate", "queue_full", "queue_timeout")
+
+
+async def reject(send: Send, status: int, retry_after: float, message: str) -> None:
+    """直接返回带 Retry-After 的 JSON-RPC 错误响应，不进入 MCP 处理流程"""
+    body = json.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32000, "message": message}}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode("ascii")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class TokenBucket:
+    """令牌桶，按时间差惰性补充令牌"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """尝试取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """按键（会话 ID 或客户端 IP）划分的令牌桶集合，键数有上限"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst else max(1.0, rate * DEFAULT_BURST_FACTOR)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def take(self, key: str, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(now)
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = anyio.Event()
+        self.granted = False
+
+
+class AdmissionControl:
+    """
+    MCP 端点的准入控制
+
+    依次检查每会话和每客户端 IP 的令牌桶（超出返回 429），再检查全局并发上限：
+    有空位直接放行，否则进入有界的 FIFO 等待队列，等待超过 ``queue_timeout`` 秒或队列已满时返回 503。
+    被拒绝的请求不会进入 MCP 处理流程，已放行请求的延迟不受过载影响。
+    GET 请求是长期打开的 SSE 流，只做限速，不占用并发名额。
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 0,
+        queue_size: int = 100,
+        queue_timeout: float = 1.0,
+        session_rate: float = 0.0,
+        session_burst: Optional[float] = None,
+        ip_rate: float = 0.0,
+        ip_burst: Optional[float] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.session_limiter = RateLimiter(session_rate, session_burst) if session_rate > 0 else None
+        self.ip_limiter = RateLimiter(ip_rate, ip_burst) if ip_rate > 0 else None
+        self.in_flight = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {reason: 0 for reason in REJECT_REASONS}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0 or self.session_limiter is not None or self.ip_limiter is not None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _check_rate(self, scope: Scope, now: float) -> Optional[tuple]:
+        """返回 (拒绝原因, 建议重试秒数)，未超限时返回 None"""
+        if self.session_limiter is not None:
+            for name, value in scope["headers"]:
+                if name == b"mcp-session-id":
+                    wait = self.session_limiter.take(value.decode("latin-1"), now)
+                    if wait:
+                        return "session_rate", wait
+                    break
+        if self.ip_limiter is not None and scope.get("client"):
+            wait = self.ip_limiter.take(scope["client"][0], now)
+            if wait:
+                return "ip_rate", wait
+        return None
+
+    async def _acquire(self) -> Optional[str]:
+        """占用一个并发名额，失败时返回拒绝原因"""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        waiter = _Waiter()
+        self._waiters.append(waiter)
+        try:
+            with anyio.move_on_after(self.queue_timeout):
+                await waiter.event.wait()
+        except BaseException:
+            # 被外部取消（如客户端断开）：还在排队就出队，名额已转交过来就交还，否则名额会泄漏
+            if waiter.granted:
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        if waiter.granted:
+            # 名额由 _release 直接转交，in_flight 已经计入
+            return None
+        self._waiters.remove(waiter)
+        return "queue_timeout"
+
+    def _release(self) -> None:
+        """释放名额；有等待者时直接转交给队首，不让新请求插队"""
+        if self._waiters:
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+            waiter.event.set()
+            return
+        self.in_flight -= 1
+
+    def wrap(self, app: ASGIApp) -> ASGIApp:
+        """包装 MCP 端点的 ASGI 应用"""
+
+        async def admitted(scope: Scope, receive: Receive, send: Send) -> None:
+            limited = self._check_rate(scope, time.monotonic())
+            if limited is not None:
+                reason, wait = limited
+                self.rejected[reason] += 1
+                await reject(send, 429, wait, "Rate limit exceeded, retry later")
+                return
+
+            if self.max_in_flight <= 0 or scope["method"] == "GET":
+                self.admitted += 1
+                await app(scope, receive, send)
+                return
+
+            reason = await self._acquire()
+            if reason is not None:
+                self.rejected[reason] += 1
+                await reject(send, 503, self.queue_timeout, "Server overloaded, retry later")
+                return
+            self.admitted += 1
+            try:
+                await app(scope, receive, send)
+            finally:
+                self._release()
+
+        return admitted
+
+    def metric_lines(self) -> List[str]:
+        lines = [
+            "# HELP mcp_admission_in_flight Requests holding a concurrency slot.",
+            "# TYPE mcp_admission_in_flight gauge",
+            f"mcp_admission_in_flight {self.in_flight}",
+            "# HELP mcp_admission_queued Requests waiting for a concurrency slot.",
+            "# TYPE mcp_admission_queued gauge",
+            f"mcp_admission_queued {self.queued}",
+            "# HELP mcp_admission_admitted_total Requests admitted to the MCP endpoint.",
+            "# TYPE mcp_admission_admitted_total counter",
+            f"mcp_admission_admitted_total {self.admitted}",
+            "# HELP mcp_admission_rejected_total Requests shed by admission control, by reason.",
+            "# TYPE mcp_admission_rejected_total counter",
+        ]
+        lines.extend(
+            f'mcp_admission_rejected_total{{reason="{reason}"}} {count}' for reason, count in self.rejected.items()
+        )
+        return lines
@@ -0,0 +1,270 @@
+import importlib
+import json
+import mmap
+import os
+import struct
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import click
+
+# 文件头：魔数、格式版本、元数据（JSON）长度
+MAGIC = b"HMCPDS\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+
+# 字段类型使用 struct 格式码；"s" 表示字符串，记录中存放指向字符串表的 (偏移, 长度)
+FIELD_CODES = {"B": "B", "H": "H", "I": "I", "q": "q", "d": "d", "s": "II"}
+# 数值索引项的键类型：整数统一存为 q，浮点存为 d
+INDEX_KEY_CODES = {"B": "q", "H": "q", "I": "q", "q": "q", "d": "d"}
+STRING_INDEX_ENTRY = struct.Struct("<III")
+
+# 可以用 build 命令生成的数据集：名称 -> "模块:DatasetSpec 变量"
+DATASETS = {
+    "periodic_table": "periodic_table:ELEMENT_DATASET",
+}
+
+
+class IndexSpec(NamedTuple):
+    name: str
+    field: str
+    # 字符串键是否忽略大小写（构建和查找时都做 casefold）
+    casefold: bool = False
+
+
+class DatasetSpec(NamedTuple):
+    """数据集描述：字段按记录中的顺序排列，records 返回与字段顺序一致的元组"""
+
+    name: str
+    fields: Tuple[Tuple[str, str], ...]
+    indexes: Tuple[IndexSpec, ...]
+    records: Callable[[], Iterable[Sequence[Any]]]
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def build_dataset(spec: DatasetSpec, path: str) -> int:
+    """
+    把数据集编译成定长记录的二进制文件
+
+    文件布局：文件头 + 元数据 JSON，之后依次是定长记录区、UTF-8 字符串表和各个有序索引，
+    每个区按 8 字节对齐。先写临时文件再原子替换，已经映射旧文件的进程不受影响。
+
+    Returns:
+        写入的记录数
+    """
+    field_codes = dict(spec.fields)
+    record_struct = struct.Struct("<" + "".join(FIELD_CODES[code] for _, code in spec.fields))
+
+    strings = bytearray()
+    string_offsets: Dict[bytes, int] = {}
+
+    def intern(text: str) -> Tuple[int, int]:
+        data = text.encode("utf-8")
+        offset = string_offsets.get(data)
+        if offset is None:
+            offset = string_offsets[data] = len(strings)
+            strings.extend(data)
+        return offset, len(data)
+
+    records = bytearray()
+    columns: Dict[str, List[Any]] = {name: [] for name, _ in spec.fields}
+    count = 0
+    for record in spec.records():
+        values: List[Any] = []
+        for (name, code), value in zip(spec.fields, record):
+            columns[name].append(value)
+            values.extend(intern(value) if code == "s" else (value,))
+        records.extend(record_struct.pack(*values))
+        count += 1
+
+    index_sections: List[Tuple[IndexSpec, str, bytes]] = []
+    for index in spec.indexes:
+        code = field_codes[index.field]
+        keys = columns[index.field]
+        if code == "s":
+            encoded = [(key.casefold() if index.casefold else key).encode("utf-8") for key in keys]
+            # 按键的字节序排序，键相同时保留行号最小的记录在前
+            order = sorted(range(count), key=lambda row: (encoded[row], row))
+            entries = bytearray()
+            for row in order:
+                entries.extend(STRING_INDEX_ENTRY.pack(*intern(encoded[row].decode("utf-8")), row))
+            index_sections.append((index, "s", bytes(entries)))
+        else:
+            key_code = INDEX_KEY_CODES[code]
+            entry = struct.Struct(f"<{key_code}I")
+            order = sorted(range(count), key=lambda row: (keys[row], row))
+            entries = b"".join(entry.pack(keys[row], row) for row in order)
+            index_sections.append((index, key_code, entries))
+
+    # 各区相对数据区起点的偏移
+    sections: List[bytes] = []
+    offset = 0
+
+    def add_section(data: bytes) -> int:
+        nonlocal offset
+        start = offset
+        sections.append(data + b"\x00" * (_align(len(data)) - len(data)))
+        offset += _align(len(data))
+        return start
+
+    records_offset = add_section(bytes(records))
+    indexes_meta: Dict[str, Dict[str, Any]] = {}
+    for index, key_code, entries in index_sections:
+        indexes_meta[index.name] = {
+            "field": index.field,
+            "casefold": index.casefold,
+            "key": key_code,
+            "offset": add_section(entries),
+            "count": count,
+        }
+    # 字符串表最后写入，构建索引时加入的键也在其中
+    strings_offset = add_section(bytes(strings))
+
+    meta = json.dumps(
+        {
+            "name": spec.name,
+            "fields": [list(field) for field in spec.fields],
+            "count": count,
+            "record_size": record_struct.size,
+            "records_offset": records_offset,
+            "strings_offset": strings_offset,
+            "strings_size": len(strings),
+            "indexes": indexes_meta,
+        },
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    header = HEADER.pack(MAGIC, VERSION, len(meta)) + meta
+    header += b"\x00" * (_align(len(header)) - len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp_path, path)
+    return count
+
+
+class MappedDataset:
+    """
+    以 mmap 只读映射的二进制数据集
+
+    记录和索引都直接在映射的内存上用 struct.unpack_from 解码，不会把整个文件读入内存，
+    只有查找时实际访问到的页才会被操作系统读入。索引查找是有序索引上的二分查找。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, meta_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"不支持的数据集文件: {path}")
+        meta = json.loads(self._mmap[HEADER.size:HEADER.size + meta_size].decode("utf-8"))
+        base = _align(HEADER.size + meta_size)
+
+        self.name: str = meta["name"]
+        self.fields: Tuple[Tuple[str, str], ...] = tuple((name, code) for name, code in meta["fields"])
+        self._count: int = meta["count"]
+        self._record = struct.Struct("<" + "".join(FIELD_CODES[code] for _, code in self.fields))
+        self._records_offset = base + meta["records_offset"]
+        self._strings_offset = base + meta["strings_offset"]
+        # 索引名 -> (索引项结构, 起始偏移, 项数, 是否字符串键, 是否忽略大小写)
+        self._indexes: Dict[str, Tuple[struct.Struct, int, int, bool, bool]] = {}
+        for name, index in meta["indexes"].items():
+            is_string = index["key"] == "s"
+            entry = STRING_INDEX_ENTRY if is_string else struct.Struct(f"<{index['key']}I")
+            self._indexes[name] = (entry, base + index["offset"], index["count"], is_string, index["casefold"])
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "MappedDataset":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def record(self, row: int) -> Tuple[Any, ...]:
+        """解码第 row 条记录，返回与字段顺序一致的元组"""
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+        raw = self._record.unpack_from(self._mmap, self._records_offset + row * self._record.size)
+        values: List[Any] = []
+        position = 0
+        for _, code in self.fields:
+            if code == "s":
+                values.append(self._string(raw[position], raw[position + 1]))
+                position += 2
+            else:
+                values.append(raw[position])
+                position += 1
+        return tuple(values)
+
+    def records(self) -> Iterable[Tuple[Any, ...]]:
+        for row in range(self._count):
+            yield self.record(row)
+
+    def lookup(self, index_name: str, key: Any) -> Optional[int]:
+        """在指定索引中查找键，返回最先写入的匹配记录的行号，没有则返回 None"""
+        entry, start, count, is_string, casefold = self._indexes[index_name]
+        mm = self._mmap
+        if is_string:
+            target = (key.casefold() if casefold else key).encode("utf-8")
+            strings = self._strings_offset
+        else:
+            target = key
+
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if is_string:
+                offset, length, _ = entry.unpack_from(mm, start + middle * entry.size)
+                current = mm[strings + offset:strings + offset + length]
+            else:
+                current = entry.unpack_from(mm, start + middle * entry.size)[0]
+            if current < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == count:
+            return None
+        values = entry.unpack_from(mm, start + low * entry.size)
+        if is_string:
+            found = mm[strings + values[0]:strings + values[0] + values[1]]
+        else:
+            found = values[0]
+        return values[-1] if found == target else None
+
+    def get(self, index_name: str, key: Any) -> Optional[Tuple[Any, ...]]:
+        """按索引查找并解码记录"""
+        row = self.lookup(index_name, key)
+        return self.record(row) if row is not None else None
+
+    def close(self) -> None:
+        self._mmap.close()
+
+
+def load_spec(name: str) -> DatasetSpec:
+    module_name, attribute = DATASETS[name].split(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+@click.command()
+@click.argument("dataset", type=click.Choice(sorted(DATASETS)), default="periodic_table")
+@click.option("--output", "-o", default=None, help="Output file (default: <dataset>.bin)")
+def main(dataset: str, output: Optional[str]) -> int:
+    """Compile a dataset into the memory-mapped binary format"""
+    path = output or f"{dataset}.bin"
+    count = build_dataset(load_spec(dataset), path)
+    click.echo(f"wrote {count} records to {path} ({os.path.getsize(path)} bytes)")
+    return 0
@@ -0,0 +1,165 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, NamedTuple, Optional
+
+from mcp.server.streamable_http import EventCallback, EventId, EventMessage, EventStore, StreamId
+from mcp.types import JSONRPCMessage
+
+logger = logging.getLogger(__name__)
+
+
+class StoredEvent(NamedTuple):
+    sequence: int
+    # 序列化后的 JSON；None 表示 SDK 写入的 priming 事件，只占位不重放
+    payload: Optional[str]
+    created_at: float
+
+
+class BoundedEventStore(EventStore):
+    """
+    有界的内存事件存储，用于 SSE 流断开后按 Last-Event-ID 续传
+
+    每个流是一个环形缓冲区，超过 ``max_stream_events`` 条或 ``max_stream_bytes`` 字节时丢弃最旧的事件；
+    所有流合计超过 ``max_bytes`` 时，从最久未活动的流开始淘汰；超过 ``ttl`` 秒的事件在写入时顺带清理。
+    事件以序列化后的 JSON 字符串保存，内存按字符串长度统计。
+    事件 ID 是全局递增的序号，重放时只发送同一个流中序号更大的事件。
+    所有操作都在事件循环中同步完成，不需要加锁。
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_stream_events: int = 1000,
+        max_stream_bytes: int = 4 * 1024 * 1024,
+        ttl: Optional[float] = 300.0,
+    ):
+        self.max_bytes = max_bytes
+        self.max_stream_events = max_stream_events
+        self.max_stream_bytes = max_stream_bytes
+        self.ttl = ttl
+        # stream_id -> 事件环形缓冲区，按最近活动时间排序（最久未活动的在前）
+        self._streams: "OrderedDict[StreamId, Deque[StoredEvent]]" = OrderedDict()
+        self._stream_bytes: Dict[StreamId, int] = {}
+        # 事件序号 -> 所属流，用于根据 Last-Event-ID 找到要重放的流
+        self._event_streams: Dict[int, StreamId] = {}
+        self._sequence = 0
+        self.bytes = 0
+        self.evicted_events = 0
+        self.replays = 0
+        self.replay_misses = 0
+
+    @property
+    def events(self) -> int:
+        return len(self._event_streams)
+
+    @property
+    def streams(self) -> int:
+        return len(self._streams)
+
+    async def store_event(self, stream_id: StreamId, message: Optional[JSONRPCMessage]) -> EventId:
+        now = time.monotonic()
+        self._sequence += 1
+        payload = message.model_dump_json(by_alias=True, exclude_none=True) if message is not None else None
+        event = StoredEvent(self._sequence, payload, now)
+        size = len(payload) if payload is not None else 0
+
+        events = self._streams.get(stream_id)
+        if events is None:
+            events = self._streams[stream_id] = deque()
+            self._stream_bytes[stream_id] = 0
+        else:
+            self._streams.move_to_end(stream_id)
+        events.append(event)
+        self._event_streams[event.sequence] = stream_id
+        self._stream_bytes[stream_id] += size
+        self.bytes += size
+
+        # 流内按条数、字节数和过期时间淘汰，但至少保留刚写入的事件
+        while len(events) > 1 and (
+            len(events) > self.max_stream_events
+            or self._stream_bytes[stream_id] > self.max_stream_bytes
+            or self._expired(events[0], now)
+        ):
+            self._evict_oldest(stream_id, events)
+        self._enforce_limits(now, keep=stream_id)
+        return str(event.sequence)
+
+    def _expired(self, event: StoredEvent, now: float) -> bool:
+        return self.ttl is not None and now - event.created_at >= self.ttl
+
+    def _evict_oldest(self, stream_id: StreamId, events: Deque[StoredEvent]) -> None:
+        event = events.popleft()
+        del self._event_streams[event.sequence]
+        size = len(event.payload) if event.payload is not None else 0
+        self._stream_bytes[stream_id] -= size
+        self.bytes -= size
+        self.evicted_events += 1
+        if not events:
+            del self._streams[stream_id]
+            del self._stream_bytes[stream_id]
+
+    def _enforce_limits(self, now: float, keep: StreamId) -> None:
+        """从最久未活动的流开始，淘汰过期事件和超出全局内存上限的事件"""
+        while self._streams:
+            stream_id, events = next(iter(self._streams.items()))
+            if stream_id == keep:
+                break
+            if self.bytes > self.max_bytes or self._expired(events[-1], now):
+                # 整个流都过期，或者需要腾出内存：丢弃该流全部事件
+                while stream_id in self._streams:
+                    self._evict_oldest(stream_id, events)
+            else:
+                break
+        # 只剩当前流仍超限时，淘汰它自己的旧事件
+        events = self._streams.get(keep)
+        while events is not None and len(events) > 1 and self.bytes > self.max_bytes:
+            self._evict_oldest(keep, events)
+
+    async def replay_events_after(self, last_event_id: EventId, send_callback: EventCallback) -> Optional[StreamId]:
+        try:
+            sequence = int(last_event_id)
+        except ValueError:
+            sequence = -1
+        stream_id = self._event_streams.get(sequence)
+        if stream_id is None:
+            # 事件已被淘汰或 ID 无效，无法续传
+            self.replay_misses += 1
+            logger.warning("无法续传: 事件 %s 不存在或已被淘汰", last_event_id)
+            return None
+
+        self.replays += 1
+        self._streams.move_to_end(stream_id)
+        # 先复制出待发送的事件，发送过程中可能有新事件写入同一个流
+        pending = [event for event in self._streams[stream_id] if event.sequence > sequence]
+        for event in pending:
+            if event.payload is not None:
+                message = JSONRPCMessage.model_validate_json(event.payload)
+                await send_callback(EventMessage(message, str(event.sequence)))
+        return stream_id
+
+    def metric_lines(self) -> List[str]:
+        """以 Prometheus 文本格式导出事件存储的内存用量"""
+        return [
+            "# HELP mcp_event_store_bytes Serialized bytes held by the SSE event store.",
+            "# TYPE mcp_event_store_bytes gauge",
+            f"mcp_event_store_bytes {self.bytes}",
+            "# HELP mcp_event_store_max_bytes Configured memory cap of the SSE event store.",
+            "# TYPE mcp_event_store_max_bytes gauge",
+            f"mcp_event_store_max_bytes {self.max_bytes}",
+            "# HELP mcp_event_store_events Events currently held by the SSE event store.",
+            "# TYPE mcp_event_store_events gauge",
+            f"mcp_event_store_events {self.events}",
+            "# HELP mcp_event_store_streams Streams currently held by the SSE event store.",
+            "# TYPE mcp_event_store_streams gauge",
+            f"mcp_event_store_streams {self.streams}",
+            "# HELP mcp_event_store_evicted_total Events evicted by size, count or TTL limits.",
+            "# TYPE mcp_event_store_evicted_total counter",
+            f"mcp_event_store_evicted_total {self.evicted_events}",
+            "# HELP mcp_event_store_replays_total Stream resumptions served from the event store.",
+            "# TYPE mcp_event_store_replays_total counter",
+            f"mcp_event_store_replays_total {self.replays}",
+            "# HELP mcp_event_store_replay_misses_total Resumptions whose Last-Event-ID was no longer stored.",
+            "# TYPE mcp_event_store_replay_misses_total counter",
+            f"mcp_event_store_replay_misses_total {self.replay_misses}",
+        ]
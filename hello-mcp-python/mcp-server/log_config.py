@@ -0,0 +1,144 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from typing import Any, Dict, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+PROFILES = ("development", "production")
+# 日志队列的容量，队列满时丢弃新记录而不是阻塞事件循环
+QUEUE_SIZE = 10_000
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，附带记录上的 route 和 tool 字段"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("route", "tool"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按路由采样 INFO 及以下级别的日志
+
+    路由取记录的 ``route`` 属性，没有时取 logger 名称（如 ``uvicorn.access``）；
+    没有配置采样率的路由和 WARNING 及以上级别的记录全部保留。
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, "route", record.name))
+        return rate is None or random.random() < rate
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录并计数，写日志的线程永远不会阻塞"""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        入队前只把参数合并进消息，格式化（包括 JSON 和异常堆栈）都留给后台线程
+
+        QueueHandler 默认在这里就调用 format，事件循环线程照样承担格式化开销，
+        还会把堆栈折进消息并清掉 exc_info，JsonFormatter 就输出不了 exception 字段。
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(values: tuple) -> Dict[str, float]:
+    """解析 ``ROUTE=RATE`` 形式的采样配置，如 ``tools/call=0.01``"""
+    rates: Dict[str, float] = {}
+    for value in values:
+        route, _, rate = value.partition("=")
+        if not route or not rate:
+            raise ValueError(f"采样配置应为 ROUTE=RATE: {value}")
+        rates[route] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+
+def uvicorn_log_config(sample_rates: Dict[str, float]) -> Dict[str, Any]:
+    """
+    development 下传给 uvicorn 的日志配置
+
+    uvicorn 自带的配置给 ``uvicorn.access`` 等 logger 单独配了 handler 且不向根 logger 传播，
+    根 handler 上的采样过滤器管不到它们，这里在它的每个 handler 上也加上同样的过滤器。
+    """
+    from uvicorn.config import LOGGING_CONFIG
+
+    config = copy.deepcopy(LOGGING_CONFIG)
+    config["filters"] = {"sampling": {"()": SamplingFilter, "rates": sample_rates}}
+    for handler in config["handlers"].values():
+        handler.setdefault("filters", []).append("sampling")
+    return config
+
+
+def configure_logging(
+    log_level: str,
+    profile: str = "development",
+    log_format: Optional[str] = None,
+    sample_rates: Optional[Dict[str, float]] = None,
+) -> None:
+    """
+    配置根日志
+
+    development：直接输出文本日志，与之前的行为一致。
+    production：日志记录先放入有界队列，由后台线程格式化并写出，默认输出 JSON；
+    采样在入队前完成，被丢弃的记录不会进入队列。
+    """
+    level = getattr(logging, log_level.upper())
+    log_format = log_format or ("json" if profile == "production" else "text")
+    formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    if profile != "production":
+        if sample_rates:
+            stream_handler.addFilter(SamplingFilter(sample_rates))
+        logging.basicConfig(level=level, handlers=[stream_handler])
+        return
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
@@ -0,0 +1,122 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 延迟直方图的桶边界（秒），覆盖从缓存命中的亚毫秒级到慢请求的秒级
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """固定桶边界的直方图，observe 只做一次二分查找和几次整数加法"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # 最后一个槽位对应 +Inf
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+class Metrics:
+    """
+    服务端指标
+
+    所有记录都发生在同一个事件循环里，因此只用普通的整数和字典，不加锁。
+    多 worker 部署时每个进程各自统计，由 Prometheus 按实例区分。
+    """
+
+    def __init__(self):
+        # (method, tool) -> 延迟直方图，_count 即调用次数
+        self.request_duration: Dict[Tuple[str, str], Histogram] = {}
+        self.request_errors: Dict[Tuple[str, str], int] = {}
+        self.http_in_flight = 0
+        self.http_requests = 0
+        self.http_bytes_sent = 0
+        self.active_sessions: Callable[[], int] = lambda: 0
+        # 其他组件导出的指标，每个函数返回若干行 Prometheus 文本
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def observe_request(self, method: str, tool: str, seconds: float, error: bool = False) -> None:
+        """记录一次 MCP 请求的耗时和是否出错"""
+        key = (method, tool)
+        histogram = self.request_duration.get(key)
+        if histogram is None:
+            histogram = self.request_duration[key] = Histogram()
+        histogram.observe(seconds)
+        if error:
+            self.request_errors[key] = self.request_errors.get(key, 0) + 1
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式导出全部指标"""
+        lines = [
+            "# HELP mcp_request_duration_seconds MCP request handling latency by method and tool.",
+            "# TYPE mcp_request_duration_seconds histogram",
+        ]
+        for (method, tool), histogram in sorted(self.request_duration.items()):
+            labels = _labels(method=method, tool=tool)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'mcp_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'mcp_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"mcp_request_duration_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"mcp_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        lines.append("# HELP mcp_request_errors_total MCP requests that failed, by method and tool.")
+        lines.append("# TYPE mcp_request_errors_total counter")
+        for (method, tool), count in sorted(self.request_errors.items()):
+            lines.append(f"mcp_request_errors_total{{{_labels(method=method, tool=tool)}}} {count}")
+
+        lines.extend(
+            [
+                "# HELP mcp_active_sessions Stateful sessions currently held by the session manager.",
+                "# TYPE mcp_active_sessions gauge",
+                f"mcp_active_sessions {self.active_sessions()}",
+                "# HELP mcp_http_requests_in_flight HTTP requests to the MCP endpoint currently being served.",
+                "# TYPE mcp_http_requests_in_flight gauge",
+                f"mcp_http_requests_in_flight {self.http_in_flight}",
+                "# HELP mcp_http_requests_total HTTP requests received by the MCP endpoint.",
+                "# TYPE mcp_http_requests_total counter",
+                f"mcp_http_requests_total {self.http_requests}",
+                "# HELP mcp_http_response_bytes_total Response body bytes sent by the MCP endpoint.",
+                "# TYPE mcp_http_response_bytes_total counter",
+                f"mcp_http_response_bytes_total {self.http_bytes_sent}",
+            ]
+        )
+        for collect in self.collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+    def instrument(self, app: ASGIApp) -> ASGIApp:
+        """包装 ASGI 应用，统计进行中的请求数和发送的响应字节数"""
+
+        async def instrumented(scope: Scope, receive: Receive, send: Send) -> None:
+            async def counting_send(message: Message) -> None:
+                if message["type"] == "http.response.body":
+                    self.http_bytes_sent += len(message.get("body", b""))
+                await send(message)
+
+            self.http_requests += 1
+            self.http_in_flight += 1
+            try:
+                await app(scope, receive, counting_send)
+            finally:
+                self.http_in_flight -= 1
+
+        return instrumented
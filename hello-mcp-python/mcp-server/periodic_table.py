@@ -1,7 +1,11 @@
-from dataclasses import dataclass
-from typing import List, Optional, Dict, Any
+from collections.abc import Iterator, Sequence
+from dataclasses import astuple, dataclass
+from types import MappingProxyType
+from typing import List, Optional, Dict, Any, Iterable, Mapping, Tuple
 
-@dataclass
+from dataset import DatasetSpec, IndexSpec, MappedDataset
+
+@dataclass(frozen=True)
 class Element:
     atomic_number: int
     symbol: str
@@ -77,7 +81,7 @@ periodic_table: List[Element] = [
     Element(52, "Te", "碲", "dì", "Tellurium", 127.6, 5, "VIA"),
     Element(53, "I", "碘", "diǎn", "Iodine", 126.9, 5, "VIIA"),
     Element(54, "Xe", "氙", "xiān", "Xenon", 131.29, 5, "0族"),
-    
+
      # 周期6（32种）
     Element(55, "Cs", "铯", "sè", "Cesium", 132.91, 6, "IA"),
     Element(56, "Ba", "钡", "bèi", "Barium", 137.33, 6, "IIA"),
@@ -147,7 +151,169 @@ periodic_table: List[Element] = [
     Element(118, "Og", "鿫", "ào", "Oganesson", 294.0, 7, "0族"),
 ]
 
-def _element_to_dict(element: Element) -> Dict[str, Any]:
+class ElementIndex:
+    """
+    元素多键查找索引
+
+    在构建时一次性生成中文名、英文名（忽略大小写）、符号（忽略大小写）的字典，
+    以及按原子序数直接寻址的数组，之后每次查找都是 O(1)。索引构建后不可修改。
+    """
+
+    __slots__ = ("_elements", "_by_name", "_by_english_name", "_by_symbol", "_by_atomic_number")
+
+    def __init__(self, elements: Iterable[Element]):
+        elements = tuple(elements)
+        self._elements: Tuple[Element, ...] = elements
+        by_name: Dict[str, Element] = {}
+        by_english_name: Dict[str, Element] = {}
+        by_symbol: Dict[str, Element] = {}
+        max_number = max((el.atomic_number for el in elements), default=0)
+        by_atomic_number: List[Optional[Element]] = [None] * (max_number + 1)
+
+        for element in elements:
+            by_name.setdefault(element.name, element)
+            by_english_name.setdefault(element.english_name.casefold(), element)
+            by_symbol.setdefault(element.symbol.casefold(), element)
+            if by_atomic_number[element.atomic_number] is None:
+                by_atomic_number[element.atomic_number] = element
+
+        self._by_name: Mapping[str, Element] = MappingProxyType(by_name)
+        self._by_english_name: Mapping[str, Element] = MappingProxyType(by_english_name)
+        self._by_symbol: Mapping[str, Element] = MappingProxyType(by_symbol)
+        self._by_atomic_number: Tuple[Optional[Element], ...] = tuple(by_atomic_number)
+
+    @property
+    def elements(self) -> Tuple[Element, ...]:
+        """索引中的全部元素，保持数据集原有顺序"""
+        return self._elements
+
+    def by_name(self, name: str) -> Optional[Element]:
+        """根据中文名称查找元素"""
+        return self._by_name.get(name)
+
+    def by_english_name(self, english_name: str) -> Optional[Element]:
+        """根据英文名称查找元素（不区分大小写）"""
+        return self._by_english_name.get(english_name.casefold())
+
+    def by_symbol(self, symbol: str) -> Optional[Element]:
+        """根据元素符号查找元素（不区分大小写）"""
+        return self._by_symbol.get(symbol.casefold())
+
+    def by_atomic_number(self, atomic_number: int) -> Optional[Element]:
+        """根据原子序数查找元素"""
+        if 0 < atomic_number < len(self._by_atomic_number):
+            return self._by_atomic_number[atomic_number]
+        return None
+
+    def find(self, query: str) -> Optional[Element]:
+        """依次按中文名、英文名、符号查找元素"""
+        element = self._by_name.get(query)
+        if element is not None:
+            return element
+        key = query.casefold()
+        element = self._by_english_name.get(key)
+        if element is not None:
+            return element
+        return self._by_symbol.get(key)
+
+# 导入时构建一次的全局索引
+element_index = ElementIndex(periodic_table)
+
+# 元素周期表的二进制数据集描述，字段顺序与 Element 一致
+ELEMENT_DATASET = DatasetSpec(
+    name="periodic_table",
+    fields=(
+        ("atomic_number", "H"),
+        ("symbol", "s"),
+        ("name", "s"),
+        ("pronunciation", "s"),
+        ("english_name", "s"),
+        ("atomic_weight", "d"),
+        ("period", "B"),
+        ("group", "s"),
+    ),
+    indexes=(
+        IndexSpec("name", "name"),
+        IndexSpec("english_name", "english_name", casefold=True),
+        IndexSpec("symbol", "symbol", casefold=True),
+        IndexSpec("atomic_number", "atomic_number"),
+    ),
+    records=lambda: (astuple(element) for element in periodic_table),
+)
+
+class MappedElements(Sequence):
+    """mmap 数据集中全部元素的只读视图，按下标访问或遍历时才解码对应的记录，解码结果不缓存"""
+
+    __slots__ = ("_dataset",)
+
+    def __init__(self, dataset: MappedDataset):
+        self._dataset = dataset
+
+    def __len__(self) -> int:
+        return len(self._dataset)
+
+    def __getitem__(self, row: Any) -> Any:
+        if isinstance(row, slice):
+            return [Element(*self._dataset.record(i)) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        return Element(*self._dataset.record(row))
+
+    def __iter__(self) -> Iterator[Element]:
+        for record in self._dataset.records():
+            yield Element(*record)
+
+
+class MappedElementIndex:
+    """
+    基于 mmap 二进制数据集的元素索引，接口与 ElementIndex 相同
+
+    单个查找只解码命中的那条记录；elements 是按需解码的视图，不会一次解码全部记录。
+    """
+
+    __slots__ = ("dataset", "_elements")
+
+    def __init__(self, path: str):
+        self.dataset = MappedDataset(path)
+        if self.dataset.name != ELEMENT_DATASET.name:
+            self.dataset.close()
+            raise ValueError(f"{path} 不是元素周期表数据集: {self.dataset.name}")
+        self._elements = MappedElements(self.dataset)
+
+    @property
+    def elements(self) -> MappedElements:
+        """数据集中的全部元素，保持构建时的顺序"""
+        return self._elements
+
+    def _get(self, index_name: str, key: Any) -> Optional[Element]:
+        record = self.dataset.get(index_name, key)
+        return Element(*record) if record is not None else None
+
+    def by_name(self, name: str) -> Optional[Element]:
+        """根据中文名称查找元素"""
+        return self._get("name", name)
+
+    def by_english_name(self, english_name: str) -> Optional[Element]:
+        """根据英文名称查找元素（不区分大小写）"""
+        return self._get("english_name", english_name)
+
+    def by_symbol(self, symbol: str) -> Optional[Element]:
+        """根据元素符号查找元素（不区分大小写）"""
+        return self._get("symbol", symbol)
+
+    def by_atomic_number(self, atomic_number: int) -> Optional[Element]:
+        """根据原子序数查找元素"""
+        return self._get("atomic_number", atomic_number)
+
+    def find(self, query: str) -> Optional[Element]:
+        """依次按中文名、英文名、符号查找元素"""
+        for index_name in ("name", "english_name", "symbol"):
+            element = self._get(index_name, query)
+            if element is not None:
+                return element
+        return None
+
+def element_to_dict(element: Element) -> Dict[str, Any]:
     """将 Element 对象转换为字典"""
     return {
         'atomic_number': element.atomic_number,
@@ -160,59 +326,33 @@ def _element_to_dict(element: Element) -> Dict[str, Any]:
         'group': element.group
     }
 
+def _to_dict_or_none(element: Optional[Element]) -> Optional[Dict[str, Any]]:
+    return element_to_dict(element) if element is not None else None
+
 def get_element_by_name(name: str) -> Optional[Dict[str, Any]]:
     """根据中文名称查找元素"""
-    for element in periodic_table:
-        if element.name == name:
-            return _element_to_dict(element)
-    return None
+    return _to_dict_or_none(element_index.by_name(name))
 
 def get_element_by_english_name(english_name: str) -> Optional[Dict[str, Any]]:
     """根据英文名称查找元素（不区分大小写）"""
-    english_name_lower = english_name.lower()
-    for element in periodic_table:
-        if element.english_name.lower() == english_name_lower:
-            return _element_to_dict(element)
-    return None
+    return _to_dict_or_none(element_index.by_english_name(english_name))
 
 def get_element_by_symbol(symbol: str) -> Optional[Dict[str, Any]]:
     """根据元素符号查找元素（不区分大小写）"""
-    symbol_upper = symbol.upper()
-    for element in periodic_table:
-        if element.symbol.upper() == symbol_upper:
-            return _element_to_dict(element)
-    return None
+    return _to_dict_or_none(element_index.by_symbol(symbol))
 
 def get_element_by_position(atomic_number: int) -> Optional[Dict[str, Any]]:
     """根据原子序数查找元素"""
-    for element in periodic_table:
-        if element.atomic_number == atomic_number:
-            return _element_to_dict(element)
-    return None
+    return _to_dict_or_none(element_index.by_atomic_number(atomic_number))
 
 def find_element(query: str) -> Optional[Dict[str, Any]]:
     """
     统一的查询接口，支持中文名、英文名和符号查询
-    
+
     Args:
         query: 查询字符串，可以是中文名称、英文名称或元素符号
-        
+
     Returns:
         元素信息字典，如果未找到则返回 None
     """
-    # 首先尝试按中文名称查找
-    result = get_element_by_name(query)
-    if result:
-        return result
-    
-    # 尝试按英文名称查找
-    result = get_element_by_english_name(query)
-    if result:
-        return result
-    
-    # 尝试按元素符号查找
-    result = get_element_by_symbol(query)
-    if result:
-        return result
-    
-    return None
+    return _to_dict_or_none(element_index.find(query))
@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional
+
+# 单次采样允许的最长时间（秒）
+MAX_SECONDS = 60.0
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    采样式 CPU 分析器
+
+    在独立线程中按固定间隔读取目标线程（通常是运行事件循环的线程）的调用栈并计数，
+    不需要重启服务，也不会在目标线程中插桩。结果是 flamegraph.pl / speedscope 可以直接读取的折叠栈格式。
+    同一时间只允许一次采样。
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def sample(self, thread_id: int, seconds: float) -> Optional[Dict[str, int]]:
+        """
+        采样指定线程 seconds 秒，阻塞调用方线程
+
+        Returns:
+            折叠栈 -> 采样次数；已有采样在进行时返回 None
+        """
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            stacks: Counter = Counter()
+            deadline = time.monotonic() + min(seconds, MAX_SECONDS)
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(thread_id)
+                if frame is None:
+                    break
+                labels: List[str] = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                stacks[";".join(reversed(labels))] += 1
+                del frame
+                time.sleep(self.interval)
+            return dict(stacks)
+        finally:
+            self._lock.release()
+
+
+def format_folded(stacks: Dict[str, int]) -> str:
+    """输出折叠栈文本，每行 ``frame;frame;frame count``，按次数从多到少排序"""
+    lines = [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + "\n"
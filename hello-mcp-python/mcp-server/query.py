@@ -0,0 +1,143 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from periodic_table import ElementIndex, MappedElementIndex
+
+FIELDS: Tuple[str, ...] = (
+    "atomic_number", "symbol", "name", "pronunciation", "english_name", "atomic_weight", "period", "group",
+)
+SORT_FIELDS: Tuple[str, ...] = ("atomic_number", "atomic_weight", "period", "symbol", "english_name")
+# 支持范围过滤的数值列
+RANGE_FIELDS: Tuple[str, ...] = ("atomic_number", "atomic_weight")
+
+
+def _casefold_key(column: Sequence[str]) -> Callable[[int], str]:
+    """按行号取字符串列的值并忽略大小写，作为排序键"""
+    return lambda row: column[row].casefold()
+
+
+class ElementTable:
+    """
+    列式元素表
+
+    把 periodic_table 转成按列存放的定长数组（array），过滤条件编译成位掩码（每行一位的整数）：
+    周期和族预先为每个取值建好掩码，范围条件通过有序列上的二分查找和前缀掩码一次求出，
+    多个条件按位与后得到结果集，不需要逐个遍历 Element 对象。
+    """
+
+    def __init__(self, index: Union[ElementIndex, MappedElementIndex]):
+        elements = index.elements
+        # 行号与 elements 的下标一一对应
+        self.elements = elements
+        self.size = len(elements)
+        # mmap 数据集的 elements 是按需解码的视图，只遍历一次取出全部列
+        values: Dict[str, List[Any]] = {field: [] for field in FIELDS}
+        for element in elements:
+            for field, column in values.items():
+                column.append(getattr(element, field))
+        self.columns: Dict[str, Sequence[Any]] = {
+            "atomic_number": array("H", values["atomic_number"]),
+            "atomic_weight": array("d", values["atomic_weight"]),
+            "period": array("B", values["period"]),
+            "symbol": tuple(values["symbol"]),
+            "name": tuple(values["name"]),
+            "pronunciation": tuple(values["pronunciation"]),
+            "english_name": tuple(values["english_name"]),
+            "group": tuple(values["group"]),
+        }
+        self.all_rows = (1 << self.size) - 1
+
+        self._period_masks: Dict[int, int] = {}
+        for row, period in enumerate(self.columns["period"]):
+            self._period_masks[period] = self._period_masks.get(period, 0) | (1 << row)
+        self._group_masks: Dict[str, int] = {}
+        for row, group in enumerate(self.columns["group"]):
+            key = group.casefold()
+            self._group_masks[key] = self._group_masks.get(key, 0) | (1 << row)
+
+        # 每个可排序列的行号排列；数值列另存排好序的取值和前缀掩码，用于范围查询
+        self._orders: Dict[str, array] = {}
+        self._sorted_values: Dict[str, array] = {}
+        self._prefix_masks: Dict[str, List[int]] = {}
+        for field in SORT_FIELDS:
+            column = self.columns[field]
+            key = _casefold_key(column) if isinstance(column, tuple) else column.__getitem__
+            order = array("I", sorted(range(self.size), key=key))
+            self._orders[field] = order
+            if field in RANGE_FIELDS:
+                self._sorted_values[field] = array(column.typecode, (column[row] for row in order))
+                prefix = [0]
+                for row in order:
+                    prefix.append(prefix[-1] | (1 << row))
+                self._prefix_masks[field] = prefix
+
+    def period_mask(self, period: int) -> int:
+        return self._period_masks.get(period, 0)
+
+    def group_mask(self, group: str) -> int:
+        return self._group_masks.get(group.casefold(), 0)
+
+    def range_mask(self, field: str, low: Optional[float], high: Optional[float]) -> int:
+        """取值落在 [low, high] 内的行的掩码，两端为 None 表示不限"""
+        values = self._sorted_values[field]
+        prefix = self._prefix_masks[field]
+        start = 0 if low is None else bisect_left(values, low)
+        end = len(values) if high is None else bisect_right(values, high)
+        if start >= end:
+            return 0
+        return prefix[end] & ~prefix[start]
+
+    def select(
+        self,
+        period: Optional[int] = None,
+        group: Optional[str] = None,
+        atomic_number_min: Optional[int] = None,
+        atomic_number_max: Optional[int] = None,
+        atomic_weight_min: Optional[float] = None,
+        atomic_weight_max: Optional[float] = None,
+        sort_by: str = "atomic_number",
+        descending: bool = False,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Tuple[int, List[int]]:
+        """
+        过滤、排序并分页
+
+        Returns:
+            (匹配的总行数, 当前页的行号)，行号即元素在 index.elements 中的下标
+        """
+        mask = self.all_rows
+        if period is not None:
+            mask &= self.period_mask(period)
+        if group is not None:
+            mask &= self.group_mask(group)
+        if atomic_number_min is not None or atomic_number_max is not None:
+            mask &= self.range_mask("atomic_number", atomic_number_min, atomic_number_max)
+        if atomic_weight_min is not None or atomic_weight_max is not None:
+            mask &= self.range_mask("atomic_weight", atomic_weight_min, atomic_weight_max)
+
+        total = mask.bit_count()
+        if total == 0 or offset >= total:
+            return total, []
+
+        # 掩码转成字节后按排序顺序扫描，每行只是一次字节下标和移位
+        flags = mask.to_bytes((self.size + 7) // 8, "little")
+        order = self._orders[sort_by]
+        rows = order[::-1] if descending else order
+        page: List[int] = []
+        skipped = 0
+        for row in rows:
+            if flags[row >> 3] >> (row & 7) & 1:
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append(row)
+                if len(page) >= limit:
+                    break
+        return total, page
+
+    def project(self, rows: Sequence[int], fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """取出指定行的指定字段，fields 为空时返回全部字段"""
+        columns = [(field, self.columns[field]) for field in (fields or FIELDS)]
+        return [{field: column[row] for field, column in columns} for row in rows]
@@ -0,0 +1,177 @@
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple, Union
+
+from mcp.types import CallToolResult, TextContent
+
+from periodic_table import Element, ElementIndex, MappedElementIndex, element_to_dict
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖：pip install "mcp-server[fast]"
+    orjson = None
+
+# 元素的结构化输出 schema，与 element_to_dict 的字段一致
+ELEMENT_PROPERTIES: Dict[str, Any] = {
+    "atomic_number": {"type": "integer", "description": "原子序数"},
+    "symbol": {"type": "string", "description": "元素符号"},
+    "name": {"type": "string", "description": "中文名称"},
+    "pronunciation": {"type": "string", "description": "拼音"},
+    "english_name": {"type": "string", "description": "英文名称"},
+    "atomic_weight": {"type": "number", "description": "相对原子质量"},
+    "period": {"type": "integer", "description": "周期"},
+    "group": {"type": "string", "description": "族"},
+}
+ELEMENT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": ELEMENT_PROPERTIES,
+    "required": list(ELEMENT_PROPERTIES),
+}
+
+
+# 整表快照中每行的字段顺序
+TABLE_FIELDS: List[str] = list(ELEMENT_PROPERTIES)
+# mmap 数据集按需渲染时最多缓存的元素数，超过后淘汰最久未使用的
+MAPPED_CACHE_SIZE = 4096
+
+
+def dumps_json(value: Any) -> bytes:
+    """序列化为 UTF-8 JSON，安装了 orjson 时使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def format_element(element: Element) -> str:
+    """将元素格式化为工具返回的文本"""
+    return (
+        f"元素名称: {element.name} ({element.pronunciation}, {element.english_name}), "
+        f"原子序数: {element.atomic_number}, 符号: {element.symbol}, "
+        f"相对原子质量: {element.atomic_weight:.3f}, 周期: {element.period}, "
+        f"族: {element.group}"
+    )
+
+
+def text_content(text: str) -> TextContent:
+    return TextContent(type="text", text=text)
+
+
+def error_result(text: str) -> CallToolResult:
+    """工具执行失败的结果；声明了 outputSchema 的工具出错时没有结构化内容，必须标记 isError"""
+    return CallToolResult(content=[text_content(text)], isError=True)
+
+
+class TableSnapshot:
+    """
+    整张元素表的紧凑快照
+
+    格式为 ``{"version": ..., "fields": [...], "rows": [[...], ...]}``，字段名只出现一次；
+    version 是 rows 内容的 SHA-256 前 16 位，数据不变时版本不变，可以直接用作 ETag。
+    同时预先压缩好 gzip 字节，条件请求和压缩都不需要在请求时计算。
+    """
+
+    __slots__ = ("version", "etag", "count", "body", "text", "gzip")
+
+    def __init__(self, rows: List[List[Any]]):
+        encoded_rows = dumps_json(rows)
+        self.version = hashlib.sha256(encoded_rows).hexdigest()[:16]
+        self.etag = f'"{self.version}"'
+        self.count = len(rows)
+        self.body = b"".join(
+            [
+                b'{"version":',
+                dumps_json(self.version),
+                b',"fields":',
+                dumps_json(TABLE_FIELDS),
+                b',"rows":',
+                encoded_rows,
+                b"}",
+            ]
+        )
+        self.text = self.body.decode("utf-8")
+        # mtime 固定为 0，同样的内容压缩结果完全一致
+        self.gzip = gzip.compress(self.body, compresslevel=9, mtime=0)
+
+
+# 单个元素渲染好的 (TextContent, 结构化字典, JSON 字节, CallToolResult)
+_Rendered = Tuple[TextContent, Dict[str, Any], bytes, CallToolResult]
+
+
+def _render(element: Element) -> _Rendered:
+    content = text_content(format_element(element))
+    data = element_to_dict(element)
+    return content, data, dumps_json(data), CallToolResult(content=[content], structuredContent=data)
+
+
+def _table_row(data: Dict[str, Any]) -> List[Any]:
+    return [data[field] for field in TABLE_FIELDS]
+
+
+class ResponseCache:
+    """
+    预渲染的工具响应缓存
+
+    为每个元素渲染一次结果文本、结构化字典和序列化好的 JSON 字节，
+    并构建好 TextContent 和带 structuredContent 的 CallToolResult，工具调用时直接返回缓存对象；
+    整表快照（TableSnapshot）也在这里生成。内置数据集在启动时全部渲染；
+    mmap 数据集可能很大，改为第一次用到某个元素时才渲染，按原子序数放入有界的 LRU 缓存，
+    整表快照也在第一次读取时才生成，加载数据集时不会解码全部记录。
+    缓存与构建它的 ElementIndex 绑定，只有通过 reload 替换数据集时才会重新渲染。
+    """
+
+    __slots__ = ("index", "_rendered", "_lazy", "_table")
+
+    def __init__(self, index: Union[ElementIndex, MappedElementIndex]):
+        self.reload(index)
+
+    def reload(self, index: Union[ElementIndex, MappedElementIndex]) -> None:
+        """用新的数据集索引重建缓存"""
+        rendered: "OrderedDict[int, _Rendered]" = OrderedDict()
+        if isinstance(index, MappedElementIndex):
+            table = None
+        else:
+            rows: List[List[Any]] = []
+            for element in index.elements:
+                entry = rendered[element.atomic_number] = _render(element)
+                rows.append(_table_row(entry[1]))
+            table = TableSnapshot(rows)
+        # 先构建完整的新缓存再整体替换，避免请求看到新旧混合的数据
+        self._rendered = rendered
+        self._lazy = table is None
+        self._table = table
+        self.index = index
+
+    @property
+    def table(self) -> TableSnapshot:
+        """整表快照；mmap 数据集在第一次读取时才生成"""
+        if self._table is None:
+            self._table = TableSnapshot([_table_row(element_to_dict(element)) for element in self.index.elements])
+        return self._table
+
+    def _entry(self, element: Element) -> "_Rendered":
+        entry = self._rendered.get(element.atomic_number)
+        if entry is None:
+            entry = self._rendered[element.atomic_number] = _render(element)
+            if len(self._rendered) > MAPPED_CACHE_SIZE:
+                self._rendered.popitem(last=False)
+        elif self._lazy:
+            self._rendered.move_to_end(element.atomic_number)
+        return entry
+
+    def content(self, element: Element) -> TextContent:
+        """元素对应的缓存 TextContent"""
+        return self._entry(element)[0]
+
+    def structured(self, element: Element) -> Dict[str, Any]:
+        """元素对应的缓存结构化字典，调用方不能修改"""
+        return self._entry(element)[1]
+
+    def json(self, element: Element) -> bytes:
+        """元素对应的缓存 JSON 字节"""
+        return self._entry(element)[2]
+
+    def result(self, element: Element) -> CallToolResult:
+        """元素对应的缓存 CallToolResult"""
+        return self._entry(element)[3]
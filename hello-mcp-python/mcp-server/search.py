@@ -0,0 +1,100 @@
+import unicodedata
+from typing import Dict, FrozenSet, List, NamedTuple, Tuple
+
+from periodic_table import Element, ElementIndex
+
+# 低于该相似度的候选视为噪声，不返回
+MIN_SCORE = 0.4
+
+
+class SearchHit(NamedTuple):
+    element: Element
+    score: float
+    # 命中的字段：name / english_name / symbol / pinyin
+    field: str
+
+
+def strip_tones(pinyin: str) -> List[str]:
+    """去掉拼音声调，ü 同时给出常见的 v 和 u 两种写法，如 "lǜ" -> ["lv", "lu"]"""
+    decomposed = unicodedata.normalize("NFD", pinyin.casefold())
+    # ü 分解后是 u + 分音符，先换成 v 再去掉其余组合字符
+    plain = "".join(ch for ch in decomposed.replace("ü", "v") if not unicodedata.combining(ch))
+    variants = [plain]
+    if "v" in plain:
+        variants.append(plain.replace("v", "u"))
+    return variants
+
+
+def _grams(text: str) -> FrozenSet[str]:
+    """首尾加边界符后的二元组集合，短字符串（元素符号）也能得到有效的重叠度"""
+    padded = f"^{text}$"
+    return frozenset(padded[i:i + 2] for i in range(len(padded) - 1))
+
+
+class ElementSearchIndex:
+    """
+    容错的元素模糊搜索索引
+
+    启动时为每个元素的英文名、符号和去声调拼音建立二元组倒排索引，
+    查询时只累加倒排表中的重叠计数，按 Dice 系数打分；完全匹配（含中文名）得 1 分。
+    """
+
+    __slots__ = ("_keys", "_postings", "_exact")
+
+    def __init__(self, index: ElementIndex):
+        # key id -> (元素, 字段, 二元组数量)
+        keys: List[Tuple[Element, str, int]] = []
+        postings: Dict[str, List[int]] = {}
+        exact: Dict[str, List[int]] = {}
+
+        def add(element: Element, field: str, text: str) -> None:
+            key_id = len(keys)
+            grams = _grams(text)
+            keys.append((element, field, len(grams)))
+            exact.setdefault(text, []).append(key_id)
+            for gram in grams:
+                postings.setdefault(gram, []).append(key_id)
+
+        for element in index.elements:
+            add(element, "english_name", element.english_name.casefold())
+            add(element, "symbol", element.symbol.casefold())
+            for pinyin in strip_tones(element.pronunciation):
+                add(element, "pinyin", pinyin)
+            # 中文名只参与完全匹配
+            exact.setdefault(element.name, []).append(len(keys))
+            keys.append((element, "name", 0))
+
+        self._keys: Tuple[Tuple[Element, str, int], ...] = tuple(keys)
+        self._postings: Dict[str, Tuple[int, ...]] = {gram: tuple(ids) for gram, ids in postings.items()}
+        self._exact: Dict[str, Tuple[int, ...]] = {text: tuple(ids) for text, ids in exact.items()}
+
+    def search(self, query: str, limit: int = 5) -> List[SearchHit]:
+        """返回按相似度从高到低排序的前 limit 个元素"""
+        text = query.strip().casefold()
+        if not text:
+            return []
+
+        # atomic_number -> (得分, 字段, 元素)
+        best: Dict[int, Tuple[float, str, Element]] = {}
+
+        def consider(key_id: int, score: float) -> None:
+            element, field, _ = self._keys[key_id]
+            current = best.get(element.atomic_number)
+            if current is None or score > current[0]:
+                best[element.atomic_number] = (score, field, element)
+
+        for key_id in self._exact.get(text, ()):
+            consider(key_id, 1.0)
+
+        grams = _grams(text)
+        overlaps: Dict[int, int] = {}
+        for gram in grams:
+            for key_id in self._postings.get(gram, ()):
+                overlaps[key_id] = overlaps.get(key_id, 0) + 1
+        for key_id, common in overlaps.items():
+            score = 2.0 * common / (len(grams) + self._keys[key_id][2])
+            if score >= MIN_SCORE:
+                consider(key_id, score)
+
+        ranked = sorted(best.values(), key=lambda hit: (-hit[0], hit[2].atomic_number))
+        return [SearchHit(element, score, field) for score, field, element in ranked[:limit]]
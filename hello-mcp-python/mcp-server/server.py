@@ -1,164 +1,627 @@
 import contextlib
+import importlib.util
+import json
 import logging
+import os
+import threading
+import time
 from collections.abc import AsyncIterator
-from typing import Any
+from typing import Any, Dict, List, Optional, Tuple
 
 import anyio
 import click
 import mcp.types as types
 from mcp.server.lowlevel import Server
+from mcp.server.lowlevel.helper_types import ReadResourceContents
 from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
-from mcp.types import TextContent, Tool
+from mcp.types import TextContent
 from pydantic import AnyUrl
 from starlette.applications import Starlette
 from starlette.middleware.cors import CORSMiddleware
-from starlette.routing import Mount
-from starlette.types import Receive, Scope, Send
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from periodic_table import periodic_table
+from admission import AdmissionControl
+from event_store import BoundedEventStore
+from log_config import PROFILES, configure_logging, parse_sample_rates, uvicorn_log_config
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import Metrics
+from periodic_table import MappedElementIndex, element_index
+from profiler import SamplingProfiler, format_folded
+from query import FIELDS as QUERY_FIELDS
+from query import SORT_FIELDS as QUERY_SORT_FIELDS
+from query import ElementTable
+from responses import ELEMENT_PROPERTIES, ELEMENT_SCHEMA, ResponseCache, dumps_json, error_result, text_content
+from search import ElementSearchIndex
+from sessions import SessionLifecycle
+from tools import Param, ToolRegistry
+from tracing import Trace, Tracer, request_trace
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# https://github.com/modelcontextprotocol/python-sdk/tree/main/examples/servers/simple-streamablehttp
-@click.command()
-@click.option("--port", default=9900, help="Port to listen on for HTTP")
-@click.option(
-    "--log-level",
-    default="INFO",
-    help="Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)",
+
+# 启动时预渲染的元素响应缓存，只有替换数据集时才会重建
+responses = ResponseCache(element_index)
+
+# 模糊搜索索引和用于过滤、范围查询的列式元素表在第一次使用时构建，
+# 短命的 stdio 进程不用为没调用的工具付出启动时间；HTTP 服务在 create_app 中预先构建
+_search_index: Optional[ElementSearchIndex] = None
+_element_table: Optional[ElementTable] = None
+
+
+def search_index() -> ElementSearchIndex:
+    global _search_index
+    if _search_index is None:
+        _search_index = ElementSearchIndex(responses.index)
+    return _search_index
+
+
+def element_table() -> ElementTable:
+    global _element_table
+    if _element_table is None:
+        _element_table = ElementTable(responses.index)
+    return _element_table
+
+
+# 搜索结果中命中字段的显示名称
+SEARCH_FIELDS = {"name": "中文名", "english_name": "英文名", "symbol": "符号", "pinyin": "拼音"}
+
+# 预构建的错误响应
+EMPTY_NAME = error_result("元素名称不能为空")
+POSITION_OUT_OF_RANGE = error_result("原子序数必须在1-118之间")
+NOT_FOUND = error_result("元素不存在")
+EMPTY_QUERIES = error_result("查询列表不能为空")
+EMPTY_SEARCH = error_result("搜索内容不能为空")
+NO_MATCH = text_content("未找到匹配的元素")
+
+# 各工具的结构化输出 schema
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "description": "与输入顺序一致的结果，成功时带 element，失败时带 error",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": ["string", "integer"]},
+                    "element": ELEMENT_SCHEMA,
+                    "error": {"type": "string"},
+                },
+                "required": ["query"],
+            },
+        }
+    },
+    "required": ["results"],
+}
+SEARCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "hits": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "score": {"type": "number", "description": "相似度，0到1"},
+                    "field": {"type": "string", "enum": list(SEARCH_FIELDS)},
+                    "element": ELEMENT_SCHEMA,
+                },
+                "required": ["score", "field", "element"],
+            },
+        }
+    },
+    "required": ["hits"],
+}
+QUERY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "total": {"type": "integer", "description": "匹配的元素总数"},
+        "offset": {"type": "integer"},
+        "count": {"type": "integer", "description": "本页返回的元素数"},
+        "elements": {
+            "type": "array",
+            "description": "只包含 fields 指定的字段",
+            "items": {"type": "object", "properties": ELEMENT_PROPERTIES},
+        },
+    },
+    "required": ["total", "offset", "count", "elements"],
+}
+
+registry = ToolRegistry()
+
+
+def _batch_error(query: Any, error: types.CallToolResult) -> Tuple[TextContent, Dict[str, Any]]:
+    content = error.content[0]
+    return content, {"query": query, "error": content.text}
+
+
+def lookup_batch_item(query: Any) -> Tuple[TextContent, Dict[str, Any]]:
+    """解析批量查询中的单个查询项（名称、符号或原子序数），返回结果文本和对应的结构化结果"""
+    if isinstance(query, int):
+        if query < 1 or query > 118:
+            return _batch_error(query, POSITION_OUT_OF_RANGE)
+        element = responses.index.by_atomic_number(query)
+    else:
+        if not query:
+            return _batch_error(query, EMPTY_NAME)
+        element = responses.index.find(query)
+    if not element:
+        return _batch_error(query, NOT_FOUND)
+    return responses.content(element), {"query": query, "element": responses.structured(element)}
+
+
+@registry.tool(
+    "get_element",
+    "根据元素名称获取元素周期表元素信息",
+    Param("name", str, "元素的中文名称，如'氢'、'氦'等", required=True, min_length=1, error=EMPTY_NAME),
+    output_schema=ELEMENT_SCHEMA,
 )
-@click.option(
-    "--json-response",
-    is_flag=True,
-    default=False,
-    help="Enable JSON responses instead of SSE streams",
+def get_element(name: str) -> types.CallToolResult:
+    element = responses.index.by_name(name)
+    if not element:
+        return NOT_FOUND
+    return responses.result(element)
+
+
+@registry.tool(
+    "get_element_by_position",
+    "根据元素在周期表中的位置（原子序数）查询元素信息",
+    Param(
+        "position",
+        int,
+        "元素的原子序数，范围从1到118",
+        required=True,
+        minimum=1,
+        maximum=118,
+        error=POSITION_OUT_OF_RANGE,
+    ),
+    output_schema=ELEMENT_SCHEMA,
 )
-def main(
-    port: int,
-    log_level: str,
-    json_response: bool,
-) -> int:
-    # Configure logging
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+def get_element_by_position(position: int) -> types.CallToolResult:
+    element = responses.index.by_atomic_number(position)
+    if not element:
+        return NOT_FOUND
+    return responses.result(element)
+
+
+@registry.tool(
+    "get_elements",
+    "批量查询元素信息，每个查询项可以是中文名称、英文名称、元素符号或原子序数，按输入顺序逐项返回结果",
+    Param(
+        "queries",
+        list,
+        "查询项列表，如['氢', 'He', 'Carbon', 26]",
+        required=True,
+        items=(str, int),
+        min_items=1,
+        error=EMPTY_QUERIES,
+    ),
+    output_schema=BATCH_SCHEMA,
+)
+def get_elements(queries: List[Any]) -> types.CallToolResult:
+    # 每个查询项对应一条结果，顺序与输入一致
+    items = [lookup_batch_item(query) for query in queries]
+    return types.CallToolResult(
+        content=[content for content, _ in items],
+        structuredContent={"results": [result for _, result in items]},
+    )
+
+
+@registry.tool(
+    "search_elements",
+    "模糊搜索元素，容忍拼写错误，支持英文名、元素符号、中文名和不带声调的拼音（如'qing'），按相似度返回最匹配的若干元素",
+    Param("query", str, "搜索内容，如'Hydrogn'、'fe'、'qing'", required=True, min_length=1, error=EMPTY_SEARCH),
+    Param("limit", int, "最多返回的元素数量，默认5", default=5, minimum=1, maximum=20),
+    output_schema=SEARCH_SCHEMA,
+)
+def search_elements(query: str, limit: int) -> types.CallToolResult:
+    hits = search_index().search(query, limit)
+    if not hits:
+        return types.CallToolResult(content=[NO_MATCH], structuredContent={"hits": []})
+    return types.CallToolResult(
+        content=[
+            text_content(f"相似度 {hit.score:.2f}（{SEARCH_FIELDS[hit.field]}）: {responses.content(hit.element).text}")
+            for hit in hits
+        ],
+        structuredContent={
+            "hits": [
+                {"score": hit.score, "field": hit.field, "element": responses.structured(hit.element)}
+                for hit in hits
+            ]
+        },
     )
 
+
+@registry.tool(
+    "query_elements",
+    "按周期、族、原子序数范围和相对原子质量范围过滤元素，支持排序、字段投影和分页，返回 JSON",
+    Param("period", int, "周期，1到7", minimum=1, maximum=7),
+    Param("group", str, "族，如'IA'、'VIIA'、'0族'，不区分大小写"),
+    Param("atomic_number_min", int, "原子序数下限（含）"),
+    Param("atomic_number_max", int, "原子序数上限（含）"),
+    Param("atomic_weight_min", float, "相对原子质量下限（含）"),
+    Param("atomic_weight_max", float, "相对原子质量上限（含）"),
+    Param("sort_by", str, "排序字段，默认按原子序数", default="atomic_number", choices=QUERY_SORT_FIELDS),
+    Param("order", str, "排序方向，默认升序", default="asc", choices=("asc", "desc")),
+    Param("fields", list, "返回的字段，默认全部", items=(str,), choices=QUERY_FIELDS),
+    Param("offset", int, "跳过的结果数，默认0", default=0, minimum=0),
+    Param("limit", int, "返回的最大结果数，默认20", default=20, minimum=1, maximum=118),
+    output_schema=QUERY_SCHEMA,
+)
+def query_elements(
+    period: Optional[int],
+    group: Optional[str],
+    atomic_number_min: Optional[int],
+    atomic_number_max: Optional[int],
+    atomic_weight_min: Optional[float],
+    atomic_weight_max: Optional[float],
+    sort_by: str,
+    order: str,
+    fields: Optional[List[str]],
+    offset: int,
+    limit: int,
+) -> types.CallToolResult:
+    table = element_table()
+    total, rows = table.select(
+        period=period,
+        group=group,
+        atomic_number_min=atomic_number_min,
+        atomic_number_max=atomic_number_max,
+        atomic_weight_min=atomic_weight_min,
+        atomic_weight_max=atomic_weight_max,
+        sort_by=sort_by,
+        descending=order == "desc",
+        offset=offset,
+        limit=limit,
+    )
+    if fields:
+        elements = table.project(rows, fields)
+        result = {"total": total, "offset": offset, "count": len(rows), "elements": elements}
+        text = dumps_json(result)
+    else:
+        # 不投影时直接拼接缓存好的元素 JSON，不再逐个序列化
+        page = [table.elements[row] for row in rows]
+        elements = [responses.structured(element) for element in page]
+        result = {"total": total, "offset": offset, "count": len(rows), "elements": elements}
+        text = b'{"total":%d,"offset":%d,"count":%d,"elements":[%s]}' % (
+            total, offset, len(rows), b",".join(responses.json(element) for element in page)
+        )
+    return types.CallToolResult(content=[text_content(text.decode("utf-8"))], structuredContent=result)
+
+
+# tools/list 的结果是静态的，只构建和校验一次
+TOOLS = registry.list_tools_result()
+TOOL_NAMES = registry.names
+
+# 整张元素表的资源，内容为 responses.table 的紧凑快照
+TABLE_URI = "periodic-table://elements"
+TABLE_MIME_TYPE = "application/json"
+
+
+def table_resource() -> types.Resource:
+    """整表资源的描述，_meta.version 与快照内容和 /elements 的 ETag 一致"""
+    table = responses.table
+    return types.Resource(
+        uri=AnyUrl(TABLE_URI),
+        name="periodic_table",
+        description=(
+            "完整元素周期表的紧凑快照：fields 为字段名，rows 中每行按同样顺序给出一个元素的值；"
+            "version 随内容变化，可用于判断本地副本是否需要刷新"
+        ),
+        mimeType=TABLE_MIME_TYPE,
+        size=len(table.body),
+        **{"_meta": {"version": table.version, "count": table.count}},
+    )
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 中是否有与 etag 匹配的值（弱比较）"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Accept-Encoding 是否接受 gzip：显式的 gzip 项优先于 *，q=0 表示不接受"""
+    wildcard: Optional[bool] = None
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "x-gzip", "*"):
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding == "*":
+            wildcard = quality > 0
+        else:
+            return quality > 0
+    return bool(wildcard)
+
+
+# 多 worker 模式下，通过环境变量把应用参数传给 uvicorn 启动的 worker 进程
+APP_OPTIONS_ENV = "HELLO_MCP_SERVER_OPTIONS"
+
+TRANSPORTS = ("streamable-http", "stdio")
+
+# uvicorn 的事件循环和 HTTP 解析器实现；auto 表示安装了 uvloop / httptools 就使用它们
+LOOPS = ("auto", "asyncio", "uvloop")
+HTTP_PARSERS = ("auto", "h11", "httptools")
+
+
+def load_dataset(path: str) -> None:
+    """切换到 mmap 映射的二进制数据集，并重建依赖元素索引的全局对象"""
+    global _search_index, _element_table
+    index = MappedElementIndex(path)
+    responses.reload(index)
+    _search_index = None
+    _element_table = None
+    logger.info("已加载数据集 %s: %d 条记录", path, len(index.dataset))
+
+
+def create_server(metrics: Metrics, tracer: Optional[Tracer] = None) -> Server:
+    """
+    创建注册好工具和资源处理函数的 MCP Server，HTTP 和 stdio 两种传输方式共用
+
+    Args:
+        metrics: 记录请求延迟的指标
+        tracer: HTTP 请求追踪，stdio 模式下为 None
+    """
     app = Server("mcp-server")
 
-    @app.call_tool()
-    async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+    def current_trace() -> Optional[Trace]:
+        """当前 MCP 请求所属 HTTP 请求的 Trace"""
+        if tracer is None:
+            return None
+        try:
+            return request_trace(app.request_context.request)
+        except LookupError:
+            return None
+
+    # 参数由注册表中预编译的校验函数检查，跳过 SDK 每次调用时的 jsonschema 校验
+    @app.call_tool(validate_input=False)
+    async def call_tool(name: str, arguments: dict) -> types.CallToolResult:
         """
         处理工具调用
         """
-        logger.info(f"处理 tools/call 请求: {name}")
-        
-        if name == "get_element":
-            element_name = arguments.get("name")
-            if not element_name:
-                return [TextContent(type="text", text="元素名称不能为空")]
-            
-            # 查找元素
-            element = next((el for el in periodic_table if el.name == element_name), None)
-            if not element:
-                return [TextContent(type="text", text="元素不存在")]
-            
-            result_text = (
-                f"元素名称: {element.name} ({element.pronunciation}, {element.english_name}), "
-                f"原子序数: {element.atomic_number}, 符号: {element.symbol}, "
-                f"相对原子质量: {element.atomic_weight:.3f}, 周期: {element.period}, "
-                f"族: {element.group}"
-            )
-            return [TextContent(type="text", text=result_text)]
-        
-        elif name == "get_element_by_position":
-            position = arguments.get("position")
-            if position is None:
-                return [TextContent(type="text", text="位置参数不能为空")]
-            
-            if not isinstance(position, int) or position < 1 or position > 118:
-                return [TextContent(type="text", text="原子序数必须在1-118之间")]
-            
-            # 查找元素
-            element = next((el for el in periodic_table if el.atomic_number == position), None)
-            if not element:
-                return [TextContent(type="text", text="元素不存在")]
-            
-            result_text = (
-                f"元素名称: {element.name} ({element.pronunciation}, {element.english_name}), "
-                f"原子序数: {element.atomic_number}, 符号: {element.symbol}, "
-                f"相对原子质量: {element.atomic_weight:.3f}, 周期: {element.period}, "
-                f"族: {element.group}"
-            )
-            return [TextContent(type="text", text=result_text)]
-        
-        else:
-            raise ValueError(f"未知工具: {name}")
+        logger.info("处理 tools/call 请求: %s", name, extra={"route": "tools/call", "tool": name})
+        start = time.perf_counter()
+        start_ns = time.time_ns()
+        error = False
+        try:
+            result = await registry.call(name, arguments)
+            # 参数错误、元素不存在等以 isError 结果返回，同样计为错误
+            error = bool(result.isError)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            # 未知工具名统一记为 unknown，避免客户端输入撑大标签集合
+            tool = name if name in TOOL_NAMES else "unknown"
+            metrics.observe_request("tools/call", tool, time.perf_counter() - start, error)
+            trace = current_trace()
+            if trace is not None:
+                trace.record_handler(
+                    f"tools/call {tool}", start_ns, time.time_ns(), {"mcp.tool.name": tool, "error": error}
+                )
 
     @app.list_tools()
-    async def list_tools() -> list[Tool]:
+    async def list_tools() -> types.ListToolsResult:
         """
         列出所有可用工具
         """
-        logger.info("处理 tools/list 请求")
-        return [
-            Tool(
-                name="get_element",
-                description="根据元素名称获取元素周期表元素信息",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "name": {
-                            "type": "string",
-                            "description": "元素的中文名称，如'氢'、'氦'等",
-                        }
-                    },
-                    "required": ["name"],
-                },
-            ),
-            Tool(
-                name="get_element_by_position",
-                description="根据元素在周期表中的位置（原子序数）查询元素信息",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "position": {
-                            "type": "number",
-                            "description": "元素的原子序数，范围从1到118",
-                        }
-                    },
-                    "required": ["position"],
-                },
-            ),
-        ]
+        logger.info("处理 tools/list 请求", extra={"route": "tools/list"})
+        start = time.perf_counter()
+        start_ns = time.time_ns()
+        try:
+            return TOOLS
+        finally:
+            metrics.observe_request("tools/list", "", time.perf_counter() - start)
+            trace = current_trace()
+            if trace is not None:
+                trace.record_handler("tools/list", start_ns, time.time_ns())
+
+    @app.list_resources()
+    async def list_resources() -> List[types.Resource]:
+        """
+        列出所有资源
+        """
+        logger.info("处理 resources/list 请求", extra={"route": "resources/list"})
+        return [table_resource()]
+
+    @app.read_resource()
+    async def read_resource(uri: AnyUrl) -> List[ReadResourceContents]:
+        """
+        读取资源，目前只有整张元素表
+        """
+        logger.info("处理 resources/read 请求: %s", uri, extra={"route": "resources/read"})
+        if str(uri) != TABLE_URI:
+            raise ValueError(f"Unknown resource: {uri}")
+        start = time.perf_counter()
+        try:
+            return [ReadResourceContents(content=responses.table.text, mime_type=TABLE_MIME_TYPE)]
+        finally:
+            metrics.observe_request("resources/read", "", time.perf_counter() - start)
+
+    return app
+
+
+def create_app(
+    json_response: bool = False,
+    stateless: bool = False,
+    dataset: Optional[str] = None,
+    event_store_mb: int = 0,
+    session_idle_timeout: float = 600.0,
+    max_sessions: int = 1000,
+    debug: bool = True,
+    trace_file: Optional[str] = None,
+    trace_sample: float = 1.0,
+    admin: bool = False,
+    max_in_flight: int = 0,
+    queue_size: int = 100,
+    queue_timeout: float = 1.0,
+    session_rate: float = 0.0,
+    session_burst: float = 0.0,
+    ip_rate: float = 0.0,
+    ip_burst: float = 0.0,
+) -> ASGIApp:
+    """
+    构建 MCP 服务的 ASGI 应用
+
+    Args:
+        json_response: 使用 JSON 响应代替 SSE 流
+        stateless: 不保留会话状态，每个请求独立处理
+        dataset: mmap 二进制数据集路径，不指定时使用内置的 periodic_table
+        event_store_mb: SSE 事件存储的内存上限（MB），大于 0 时启用断线续传
+        session_idle_timeout: 会话空闲多少秒后被终止，0 表示不限
+        max_sessions: 同时存在的会话数上限，0 表示不限
+        debug: Starlette 调试模式，出错时返回堆栈，生产环境应关闭
+        trace_file: 按请求记录分阶段耗时的 OTLP/JSON 文件，不指定时不追踪
+        trace_sample: 被追踪的请求比例
+        admin: 开放 /admin/profile 采样分析和 /admin/sessions 会话统计接口
+        max_in_flight: MCP 端点同时处理的请求数上限，0 表示不限
+        queue_size: 达到并发上限后最多排队等待的请求数
+        queue_timeout: 排队等待的最长秒数，超时返回 503
+        session_rate: 每个会话每秒允许的请求数，0 表示不限
+        session_burst: 每个会话允许的突发请求数，0 表示速率的两倍
+        ip_rate: 每个客户端 IP 每秒允许的请求数，0 表示不限
+        ip_burst: 每个客户端 IP 允许的突发请求数，0 表示速率的两倍
+    """
+    if dataset:
+        load_dataset(dataset)
+    metrics = Metrics()
+    tracer = Tracer(trace_file, sample_rate=trace_sample) if trace_file else None
+    app = create_server(metrics, tracer)
+    # HTTP 服务常驻，启动时就构建好索引，避免首个请求承担构建时间；
+    # mmap 数据集不在启动时解码全部记录，索引在第一次调用 search_elements / query_elements 时才构建
+    if not dataset:
+        search_index()
+        element_table()
+
+    # 事件存储让断开的 SSE 流可以带 Last-Event-ID 重连，只重放错过的事件
+    event_store = None
+    if event_store_mb > 0:
+        event_store = BoundedEventStore(max_bytes=event_store_mb * 1024 * 1024)
+        metrics.collectors.append(event_store.metric_lines)
 
     # Create the session manager with our app and event store
+    # stateless 模式下每个请求都使用全新的传输层，不保留会话状态，任意 worker 都能处理任意请求
     session_manager = StreamableHTTPSessionManager(
         app=app,
+        event_store=event_store,
         json_response=json_response,
+        stateless=stateless,
     )
 
     # ASGI handler for streamable HTTP connections
     async def handle_streamable_http(scope: Scope, receive: Receive, send: Send) -> None:
         await session_manager.handle_request(scope, receive, send)
 
+    # SDK 没有公开会话数量，这里读取会话管理器内部的会话表
+    metrics.active_sessions = lambda: len(session_manager._server_instances)
+
+    # 有状态模式下统计每个会话，限制会话总数并清理空闲会话
+    lifecycle = None
+    mcp_endpoint: ASGIApp = handle_streamable_http
+    if not stateless:
+        lifecycle = SessionLifecycle(
+            session_manager,
+            idle_timeout=session_idle_timeout or None,
+            max_sessions=max_sessions or None,
+        )
+        metrics.collectors.append(lifecycle.metric_lines)
+        mcp_endpoint = lifecycle.wrap(handle_streamable_http)
+    if tracer is not None:
+        mcp_endpoint = tracer.wrap(mcp_endpoint)
+
+    # 准入控制放在最外层，被拒绝的请求不解析请求体、不进入会话和追踪
+    admission = AdmissionControl(
+        max_in_flight=max_in_flight,
+        queue_size=queue_size,
+        queue_timeout=queue_timeout,
+        session_rate=session_rate,
+        session_burst=session_burst or None,
+        ip_rate=ip_rate,
+        ip_burst=ip_burst or None,
+    )
+    if admission.enabled:
+        metrics.collectors.append(admission.metric_lines)
+        mcp_endpoint = admission.wrap(mcp_endpoint)
+
+    async def handle_metrics(request: Request) -> Response:
+        return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+    async def handle_sessions(request: Request) -> Response:
+        return JSONResponse(lifecycle.snapshot() if lifecycle is not None else [])
+
+    async def handle_table(request: Request) -> Response:
+        """整表快照的 HTTP 下载，支持 If-None-Match 条件请求和 gzip 压缩"""
+        table = responses.table
+        headers = {"ETag": table.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, table.etag):
+            return Response(status_code=304, headers=headers)
+        if _accepts_gzip(request.headers.get("accept-encoding", "")):
+            headers["Content-Encoding"] = "gzip"
+            return Response(table.gzip, media_type=TABLE_MIME_TYPE, headers=headers)
+        return Response(table.body, media_type=TABLE_MIME_TYPE, headers=headers)
+
+    profiler = SamplingProfiler()
+
+    async def handle_profile(request: Request) -> Response:
+        """采样事件循环线程 seconds 秒（默认 10），返回折叠栈"""
+        try:
+            seconds = float(request.query_params.get("seconds", "10"))
+        except ValueError:
+            return Response("seconds must be a number\n", status_code=400)
+        if seconds <= 0:
+            return Response("seconds must be positive\n", status_code=400)
+        # 本函数运行在事件循环线程中，采样在工作线程里进行，期间事件循环照常处理请求
+        loop_thread = threading.get_ident()
+        stacks = await anyio.to_thread.run_sync(profiler.sample, loop_thread, seconds)
+        if stacks is None:
+            return Response("a profile is already running\n", status_code=409)
+        return Response(format_folded(stacks), media_type="text/plain")
+
     @contextlib.asynccontextmanager
     async def lifespan(app: Starlette) -> AsyncIterator[None]:
         """Context manager for managing session manager lifecycle."""
-        async with session_manager.run():
-            logger.info("Application started with StreamableHTTP session manager!")
+        async with session_manager.run(), anyio.create_task_group() as tg:
+            if lifecycle is not None:
+                tg.start_soon(lifecycle.run_reaper)
+            logger.info("Application started with StreamableHTTP session manager! (stateless=%s)", stateless)
             try:
                 yield
             finally:
+                tg.cancel_scope.cancel()
+                if tracer is not None:
+                    tracer.close()
                 logger.info("Application shutting down...")
 
     # Create an ASGI application using the transport
+    routes = [
+        Mount("/mcp/", app=metrics.instrument(mcp_endpoint)),
+        Route("/metrics", endpoint=handle_metrics, methods=["GET"]),
+        Route("/elements", endpoint=handle_table, methods=["GET"]),
+    ]
+    if admin:
+        routes.append(Route("/admin/profile", endpoint=handle_profile, methods=["GET"]))
+        routes.append(Route("/admin/sessions", endpoint=handle_sessions, methods=["GET"]))
+
     starlette_app = Starlette(
-        debug=True,
-        routes=[
-            Mount("/mcp/", app=handle_streamable_http),
-        ],
+        debug=debug,
+        routes=routes,
         lifespan=lifespan,
     )
 
@@ -168,11 +631,317 @@ def main(
         starlette_app,
         allow_origins=["*"],  # Allow all origins - adjust as needed for production
         allow_methods=["GET", "POST", "DELETE"],  # MCP streamable HTTP methods
-        expose_headers=["Mcp-Session-Id"],
+        expose_headers=["Mcp-Session-Id", "ETag"],
     )
 
+    return starlette_app
+
+
+def app_factory() -> ASGIApp:
+    """uvicorn 多 worker 模式使用的应用工厂，从环境变量读取应用参数"""
+    options = json.loads(os.environ.get(APP_OPTIONS_ENV, "{}"))
+    configure_logging(**options.pop("logging", {"log_level": "INFO"}))
+    return create_app(**options)
+
+
+async def run_stdio(dataset: Optional[str] = None) -> None:
+    """
+    通过标准输入输出提供 MCP 服务，供本地 agent 以子进程方式启动
+
+    不创建 Starlette 应用、会话管理器和后台任务，只构建处理函数；搜索索引等按需构建。
+    stdout 只能写协议消息，日志写到 stderr。
+    """
+    from mcp.server.stdio import stdio_server
+
+    if dataset:
+        load_dataset(dataset)
+    app = create_server(Metrics())
+    async with stdio_server() as (read_stream, write_stream):
+        await app.run(read_stream, write_stream, app.create_initialization_options())
+
+
+# https://github.com/modelcontextprotocol/python-sdk/tree/main/examples/servers/simple-streamablehttp
+@click.command()
+@click.option(
+    "--transport",
+    default="streamable-http",
+    type=click.Choice(TRANSPORTS),
+    help="streamable-http serves over HTTP; stdio talks MCP over stdin/stdout for subprocess-spawned local use",
+)
+@click.option("--port", default=9900, help="Port to listen on for HTTP")
+@click.option("--host", default="127.0.0.1", help="Host to bind to, e.g. 0.0.0.0 for all interfaces")
+@click.option(
+    "--uds",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Bind to this Unix domain socket instead of --host/--port, e.g. for sidecar deployments",
+)
+@click.option(
+    "--loop",
+    default="auto",
+    type=click.Choice(LOOPS),
+    help="Event loop implementation (auto uses uvloop when installed)",
+)
+@click.option(
+    "--http",
+    default="auto",
+    type=click.Choice(HTTP_PARSERS),
+    help="HTTP/1.1 parser implementation (auto uses httptools when installed)",
+)
+@click.option(
+    "--timeout-keep-alive",
+    default=5,
+    type=click.IntRange(min=1),
+    help="Seconds to keep an idle HTTP keep-alive connection open",
+)
+@click.option(
+    "--backlog",
+    default=2048,
+    type=click.IntRange(min=1),
+    help="Maximum number of pending connections in the listen queue",
+)
+@click.option(
+    "--log-level",
+    default="INFO",
+    help="Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)",
+)
+@click.option(
+    "--json-response",
+    is_flag=True,
+    default=False,
+    help="Enable JSON responses instead of SSE streams",
+)
+@click.option(
+    "--workers",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Number of worker processes (requires --stateless when greater than 1)",
+)
+@click.option(
+    "--stateless",
+    is_flag=True,
+    default=False,
+    help="Run without per-session state so any worker can serve any request",
+)
+@click.option(
+    "--dataset",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Serve elements from a binary dataset built with mcp-dataset instead of the built-in table",
+)
+@click.option(
+    "--event-store-mb",
+    default=0,
+    type=click.IntRange(min=0),
+    help="Keep up to this many MB of SSE events so clients can resume with Last-Event-ID (0 disables)",
+)
+@click.option(
+    "--session-idle-timeout",
+    default=600.0,
+    type=click.FloatRange(min=0),
+    help="Terminate stateful sessions idle for this many seconds (0 disables)",
+)
+@click.option(
+    "--max-sessions",
+    default=1000,
+    type=click.IntRange(min=0),
+    help="Reject new sessions with 503 once this many are open (0 disables)",
+)
+@click.option(
+    "--max-in-flight",
+    default=0,
+    type=click.IntRange(min=0),
+    help="Process at most this many MCP requests at once and queue the rest (0 disables)",
+)
+@click.option(
+    "--queue-size",
+    default=100,
+    type=click.IntRange(min=0),
+    help="Requests allowed to wait for a slot when --max-in-flight is reached; beyond that return 503",
+)
+@click.option(
+    "--queue-timeout",
+    default=1.0,
+    type=click.FloatRange(min=0),
+    help="Seconds a queued request may wait for a slot before it gets 503",
+)
+@click.option(
+    "--session-rate",
+    default=0.0,
+    type=click.FloatRange(min=0),
+    help="Requests per second allowed per Mcp-Session-Id; excess gets 429 (0 disables)",
+)
+@click.option(
+    "--session-burst",
+    default=0.0,
+    type=click.FloatRange(min=0),
+    help="Burst size of the per-session token bucket (0 means twice --session-rate)",
+)
+@click.option(
+    "--ip-rate",
+    default=0.0,
+    type=click.FloatRange(min=0),
+    help="Requests per second allowed per client IP; excess gets 429 (0 disables)",
+)
+@click.option(
+    "--ip-burst",
+    default=0.0,
+    type=click.FloatRange(min=0),
+    help="Burst size of the per-IP token bucket (0 means twice --ip-rate)",
+)
+@click.option(
+    "--profile",
+    default="development",
+    type=click.Choice(PROFILES),
+    help="production disables debug tracebacks and writes logs from a background thread via a queue",
+)
+@click.option(
+    "--log-format",
+    default=None,
+    type=click.Choice(["text", "json"]),
+    help="Log line format (default: json for the production profile, text otherwise)",
+)
+@click.option(
+    "--log-sample",
+    multiple=True,
+    metavar="ROUTE=RATE",
+    help="Keep only this fraction of INFO logs for a route or logger, e.g. tools/call=0.01 or uvicorn.access=0.1",
+)
+@click.option(
+    "--trace-file",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Append per-request stage timings to this file as OTLP/JSON spans",
+)
+@click.option(
+    "--trace-sample",
+    default=1.0,
+    type=click.FloatRange(min=0.0, max=1.0),
+    help="Fraction of requests to trace when --trace-file is set",
+)
+@click.option(
+    "--admin",
+    is_flag=True,
+    default=False,
+    help=(
+        "Expose GET /admin/profile?seconds=N (sampling CPU profiler) and GET /admin/sessions; "
+        "only use on a trusted interface"
+    ),
+)
+def main(
+    transport: str,
+    port: int,
+    host: str,
+    uds: Optional[str],
+    loop: str,
+    http: str,
+    timeout_keep_alive: int,
+    backlog: int,
+    log_level: str,
+    json_response: bool,
+    workers: int,
+    stateless: bool,
+    dataset: Optional[str],
+    event_store_mb: int,
+    session_idle_timeout: float,
+    max_sessions: int,
+    max_in_flight: int,
+    queue_size: int,
+    queue_timeout: float,
+    session_rate: float,
+    session_burst: float,
+    ip_rate: float,
+    ip_burst: float,
+    profile: str,
+    log_format: Optional[str],
+    log_sample: Tuple[str, ...],
+    trace_file: Optional[str],
+    trace_sample: float,
+    admin: bool,
+) -> int:
+    if transport == "stdio" and workers > 1:
+        raise click.UsageError("--workers applies only to the streamable-http transport")
+
+    # 多个 worker 共享同一个监听 socket，同一会话的请求可能落到没有该会话的 worker 上
+    if workers > 1 and not stateless:
+        raise click.UsageError(
+            "--workers > 1 requires --stateless; for stateful sessions run one single-worker "
+            "instance per port behind a load balancer with Mcp-Session-Id affinity (see README)"
+        )
+
+    # 显式指定的实现必须已安装，否则 uvicorn 启动时才报错
+    for option, name in (("--loop", loop), ("--http", http)):
+        if name in ("uvloop", "httptools") and importlib.util.find_spec(name) is None:
+            raise click.UsageError(f'{option} {name} requires {name}; install it with: pip install "mcp-server[fast]"')
+
+    # 无状态模式不保留流，也就没有可以续传的事件
+    if event_store_mb and stateless:
+        raise click.UsageError("--event-store-mb requires stateful sessions and cannot be used with --stateless")
+
+    try:
+        sample_rates = parse_sample_rates(log_sample)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--log-sample")
+
+    # Configure logging
+    logging_options = {
+        "log_level": log_level,
+        "profile": profile,
+        "log_format": log_format,
+        "sample_rates": sample_rates,
+    }
+    configure_logging(**logging_options)
+    if transport == "stdio":
+        anyio.run(run_stdio, dataset)
+        return 0
+
+    production = profile == "production"
+    app_options = {
+        "json_response": json_response,
+        "stateless": stateless,
+        "dataset": dataset,
+        "event_store_mb": event_store_mb,
+        "session_idle_timeout": session_idle_timeout,
+        "max_sessions": max_sessions,
+        "debug": not production,
+        "trace_file": trace_file,
+        "trace_sample": trace_sample,
+        "admin": admin,
+        "max_in_flight": max_in_flight,
+        "queue_size": queue_size,
+        "queue_timeout": queue_timeout,
+        "session_rate": session_rate,
+        "session_burst": session_burst,
+        "ip_rate": ip_rate,
+        "ip_burst": ip_burst,
+    }
+    # production 下不使用 uvicorn 自带的日志配置，它的日志（含访问日志）也经过队列和采样；
+    # development 下沿用 uvicorn 的日志配置，--log-sample 的过滤器同时加在它的 handler 上
+    uvicorn_options: dict = {
+        "loop": loop,
+        "http": http,
+        "timeout_keep_alive": timeout_keep_alive,
+        "backlog": backlog,
+    }
+    if uds:
+        uvicorn_options["uds"] = uds
+    else:
+        uvicorn_options.update(host=host, port=port)
+    if production:
+        uvicorn_options["log_config"] = None
+    elif sample_rates:
+        uvicorn_options["log_config"] = uvicorn_log_config(sample_rates)
+
     import uvicorn
 
-    uvicorn.run(starlette_app, host="127.0.0.1", port=port)
+    if workers == 1:
+        uvicorn.run(create_app(**app_options), **uvicorn_options)
+    else:
+        os.environ[APP_OPTIONS_ENV] = json.dumps({"logging": logging_options, **app_options})
+        uvicorn.run("server:app_factory", factory=True, workers=workers, **uvicorn_options)
 
     return 0
+
+
+if __name__ == "__main__":
+    main()
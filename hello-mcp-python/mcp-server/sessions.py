@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import anyio
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+SESSION_HEADER = b"mcp-session-id"
+
+# 达到会话上限时返回给新会话的响应
+REJECT_BODY = json.dumps(
+    {"jsonrpc": "2.0", "id": None, "error": {"code": -32000, "message": "Too many sessions, retry later"}}
+).encode("utf-8")
+
+
+def session_digest(session_id: str) -> str:
+    """会话 ID 相当于凭据，对外（接口、日志、trace）只输出 SHA-256 摘要的前 12 位，足以区分会话和关联记录"""
+    return hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:12]
+
+
+class SessionStats:
+    """单个会话的请求计数、字节数和最近活动时间"""
+
+    __slots__ = ("session_id", "created_at", "last_activity", "requests", "bytes_received", "bytes_sent", "in_flight")
+
+    def __init__(self, session_id: str, now: float):
+        self.session_id = session_id
+        self.created_at = now
+        self.last_activity = now
+        self.requests = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        # 进行中的请求数，打开的 GET SSE 流也算在内
+        self.in_flight = 0
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "session": session_digest(self.session_id),
+            "age": now - self.created_at,
+            "idle": 0.0 if self.in_flight else now - self.last_activity,
+            "requests": self.requests,
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+            "in_flight": self.in_flight,
+        }
+
+
+class SessionLifecycle:
+    """
+    有状态会话的生命周期管理
+
+    包装 MCP 端点，按 Mcp-Session-Id 统计每个会话的请求数、收发字节数和最近活动时间；
+    会话数达到 ``max_sessions`` 时，新的初始化请求直接返回 503 和 Retry-After；
+    后台清理任务定期移除已终止的会话，并终止空闲超过 ``idle_timeout`` 秒且没有进行中请求的会话。
+    SDK 没有公开会话表，这里和指标一样读写会话管理器内部的 ``_server_instances``。
+    """
+
+    def __init__(
+        self,
+        session_manager: StreamableHTTPSessionManager,
+        idle_timeout: Optional[float] = 600.0,
+        max_sessions: Optional[int] = 1000,
+        reap_interval: float = 10.0,
+    ):
+        self.session_manager = session_manager
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.reap_interval = min(reap_interval, idle_timeout / 2) if idle_timeout else reap_interval
+        self.sessions: Dict[str, SessionStats] = {}
+        # 已放行、还没拿到会话 ID 的初始化请求，计入上限避免并发初始化突破限制
+        self._pending = 0
+        self.created = 0
+        self.rejected = 0
+        self.reaped_idle = 0
+        self.reaped_terminated = 0
+
+    @property
+    def active(self) -> int:
+        return len(self.session_manager._server_instances)
+
+    def wrap(self, app: ASGIApp) -> ASGIApp:
+        """包装 MCP 端点的 ASGI 应用"""
+
+        async def tracked(scope: Scope, receive: Receive, send: Send) -> None:
+            session_id = None
+            for name, value in scope["headers"]:
+                if name == SESSION_HEADER:
+                    session_id = value.decode("latin-1")
+                    break
+            stats = self.sessions.get(session_id) if session_id is not None else None
+
+            if session_id is None:
+                if (
+                    scope["method"] == "POST"
+                    and self.max_sessions is not None
+                    and self.active + self._pending >= self.max_sessions
+                ):
+                    self.rejected += 1
+                    await self._reject(send)
+                    return
+                await self._open_session(app, scope, receive, send)
+                return
+            if stats is None:
+                await app(scope, receive, send)
+                return
+
+            stats.requests += 1
+            stats.in_flight += 1
+            stats.last_activity = time.monotonic()
+
+            async def counting_receive() -> Message:
+                message = await receive()
+                if message["type"] == "http.request":
+                    stats.bytes_received += len(message.get("body", b""))
+                return message
+
+            async def counting_send(message: Message) -> None:
+                if message["type"] == "http.response.body":
+                    stats.bytes_sent += len(message.get("body", b""))
+                await send(message)
+
+            try:
+                await app(scope, counting_receive, counting_send)
+            finally:
+                stats.in_flight -= 1
+                stats.last_activity = time.monotonic()
+
+        return tracked
+
+    async def _open_session(self, app: ASGIApp, scope: Scope, receive: Receive, send: Send) -> None:
+        """转发没有会话 ID 的请求，从响应头中取得新建的会话 ID 并开始统计"""
+        pending = scope["method"] == "POST"
+        if pending:
+            self._pending += 1
+        stats: Optional[SessionStats] = None
+        received = 0
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def capturing_send(message: Message) -> None:
+            nonlocal stats, pending
+            if message["type"] == "http.response.start":
+                if pending:
+                    self._pending -= 1
+                    pending = False
+                for name, value in message.get("headers", []):
+                    if name.lower() == SESSION_HEADER:
+                        session_id = value.decode("latin-1")
+                        stats = self.sessions[session_id] = SessionStats(session_id, time.monotonic())
+                        stats.requests = 1
+                        stats.bytes_received = received
+                        self.created += 1
+                        break
+            elif message["type"] == "http.response.body" and stats is not None:
+                stats.bytes_sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await app(scope, counting_receive, capturing_send)
+        finally:
+            if pending:
+                self._pending -= 1
+            if stats is not None:
+                stats.last_activity = time.monotonic()
+
+    async def _reject(self, send: Send) -> None:
+        retry_after = str(int(self.reap_interval) or 1).encode("ascii")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(REJECT_BODY)).encode("ascii")),
+                    (b"retry-after", retry_after),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": REJECT_BODY})
+
+    async def reap(self) -> None:
+        """清理一次：移除已终止的会话，终止空闲超时的会话"""
+        now = time.monotonic()
+        instances = self.session_manager._server_instances
+        for session_id, transport in list(instances.items()):
+            if transport.is_terminated:
+                # 客户端 DELETE 后部分 SDK 版本会把已终止的传输层留在会话表里
+                instances.pop(session_id, None)
+                self.reaped_terminated += 1
+                continue
+            stats = self.sessions.get(session_id)
+            if (
+                self.idle_timeout is not None
+                and stats is not None
+                and stats.in_flight == 0
+                and now - stats.last_activity >= self.idle_timeout
+            ):
+                logger.info("会话 %s 空闲 %.0fs，终止", session_digest(session_id), now - stats.last_activity)
+                instances.pop(session_id, None)
+                self.reaped_idle += 1
+                await transport.terminate()
+        for session_id in [session_id for session_id in self.sessions if session_id not in instances]:
+            del self.sessions[session_id]
+
+    async def run_reaper(self) -> None:
+        """后台清理循环，随应用的 lifespan 启动和取消"""
+        while True:
+            await anyio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception:
+                logger.exception("会话清理失败")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """全部会话的统计，最近活动的在前"""
+        now = time.monotonic()
+        stats = sorted(self.sessions.values(), key=lambda item: item.last_activity, reverse=True)
+        return [item.to_dict(now) for item in stats]
+
+    def metric_lines(self) -> List[str]:
+        return [
+            "# HELP mcp_sessions_created_total Stateful sessions created.",
+            "# TYPE mcp_sessions_created_total counter",
+            f"mcp_sessions_created_total {self.created}",
+            "# HELP mcp_sessions_rejected_total New sessions rejected because the session limit was reached.",
+            "# TYPE mcp_sessions_rejected_total counter",
+            f"mcp_sessions_rejected_total {self.rejected}",
+            "# HELP mcp_sessions_reaped_total Sessions removed by the reaper, by reason.",
+            "# TYPE mcp_sessions_reaped_total counter",
+            f'mcp_sessions_reaped_total{{reason="idle"}} {self.reaped_idle}',
+            f'mcp_sessions_reaped_total{{reason="terminated"}} {self.reaped_terminated}',
+        ]
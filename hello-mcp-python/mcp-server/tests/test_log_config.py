@@ -0,0 +1,35 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+from log_config import DroppingQueueHandler, JsonFormatter
+
+
+def test_queued_exception_keeps_exception_field():
+    stream = io.StringIO()
+    stream_handler = logging.StreamHandler(stream)
+    stream_handler.setFormatter(JsonFormatter())
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+
+    logger = logging.getLogger("test_log_config")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    queue_handler = DroppingQueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("工具 %s 失败", "get_element", extra={"route": "tools/call"})
+    finally:
+        listener.stop()
+        logger.removeHandler(queue_handler)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "工具 get_element 失败"
+    assert entry["route"] == "tools/call"
+    assert "ValueError: boom" in entry["exception"]
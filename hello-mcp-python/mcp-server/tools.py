@@ -0,0 +1,297 @@
+import inspect
+from typing import Any, Callable, Dict, FrozenSet, NamedTuple, Optional, Sequence, Tuple, Union
+
+from mcp.types import CallToolResult, ListToolsResult, Tool
+
+from responses import error_result
+
+# Python 类型 -> JSON Schema 类型
+JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array"}
+TYPE_NAMES = {str: "字符串", int: "整数", float: "数字", bool: "布尔值", list: "数组"}
+
+
+class ArgumentError(ValueError):
+    """参数校验失败；constraint 为 True 表示类型正确但不满足取值约束"""
+
+    def __init__(self, message: str, constraint: bool = False):
+        super().__init__(message)
+        self.constraint = constraint
+
+
+def invalid_argument(message: str) -> CallToolResult:
+    return error_result(f"参数错误: {message}")
+
+
+def _type_checker(name: str, kind: type) -> Callable[[Any], Any]:
+    """返回检查并规整单个值类型的函数，整数值的浮点数（如 6.0）按整数处理"""
+    message = f"参数 {name} 必须是{TYPE_NAMES[kind]}"
+
+    if kind is int:
+        def check(value: Any) -> Any:
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+            if isinstance(value, float) and value.is_integer():
+                return int(value)
+            raise ArgumentError(message)
+    elif kind is float:
+        def check(value: Any) -> Any:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return value
+            raise ArgumentError(message)
+    else:
+        def check(value: Any) -> Any:
+            if isinstance(value, kind):
+                return value
+            raise ArgumentError(message)
+    return check
+
+
+class Param:
+    """
+    工具参数声明
+
+    同一份声明既生成 inputSchema，也在注册时编译成校验函数。
+    ``items`` 是数组元素允许的类型，``choices`` 对标量参数约束取值，对数组参数约束每个元素。
+    ``error`` 是不满足取值约束时返回的结果，不指定时返回通用的参数错误。
+    """
+
+    __slots__ = (
+        "name", "kind", "description", "required", "default", "minimum", "maximum",
+        "min_length", "min_items", "items", "choices", "error",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: type,
+        description: str,
+        required: bool = False,
+        default: Any = None,
+        minimum: Optional[float] = None,
+        maximum: Optional[float] = None,
+        min_length: Optional[int] = None,
+        min_items: Optional[int] = None,
+        items: Tuple[type, ...] = (),
+        choices: Optional[Sequence[Any]] = None,
+        error: Optional[CallToolResult] = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.description = description
+        self.required = required
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.min_length = min_length
+        self.min_items = min_items
+        self.items = items
+        self.choices = tuple(choices) if choices is not None else None
+        self.error = error
+
+    def schema(self) -> Dict[str, Any]:
+        """参数的 JSON Schema"""
+        schema: Dict[str, Any] = {"type": JSON_TYPES[self.kind]}
+        if self.kind is list:
+            item_types = [JSON_TYPES[kind] for kind in self.items]
+            item_schema: Dict[str, Any] = {"type": item_types[0] if len(item_types) == 1 else item_types}
+            if self.choices is not None:
+                item_schema["enum"] = list(self.choices)
+            schema["items"] = item_schema
+            if self.min_items is not None:
+                schema["minItems"] = self.min_items
+        elif self.choices is not None:
+            schema["enum"] = list(self.choices)
+        if self.minimum is not None:
+            schema["minimum"] = self.minimum
+        if self.maximum is not None:
+            schema["maximum"] = self.maximum
+        if self.min_length is not None:
+            schema["minLength"] = self.min_length
+        schema["description"] = self.description
+        return schema
+
+    def compile(self) -> Callable[[Any], Any]:
+        """把类型和约束编译成一个校验函数：返回规整后的值，不合法时抛出 ArgumentError"""
+        name = self.name
+        check_type = _type_checker(name, self.kind)
+        checks = []
+
+        if self.kind is list:
+            item_checks = [_type_checker(name, kind) for kind in self.items]
+            item_message = f"参数 {name} 的元素必须是" + "或".join(TYPE_NAMES[kind] for kind in self.items)
+
+            def check_item(value: Any) -> Any:
+                for check in item_checks:
+                    try:
+                        return check(value)
+                    except ArgumentError:
+                        pass
+                raise ArgumentError(item_message)
+
+            choices = self.choices
+            if choices is not None:
+                allowed = frozenset(choices)
+                check_plain_item = check_item
+
+                def check_item(value: Any) -> Any:
+                    value = check_plain_item(value)
+                    if value not in allowed:
+                        raise ArgumentError(f"参数 {name} 的元素必须是 {', '.join(map(str, choices))} 之一")
+                    return value
+
+            checks.append(lambda values: [check_item(value) for value in values])
+            if self.min_items is not None:
+                min_items = self.min_items
+
+                def check_min_items(values: Any) -> Any:
+                    if len(values) < min_items:
+                        raise ArgumentError(f"参数 {name} 至少需要 {min_items} 项", constraint=True)
+                    return values
+
+                checks.append(check_min_items)
+        elif self.choices is not None:
+            allowed = frozenset(self.choices)
+            choices_message = f"参数 {name} 必须是 {', '.join(map(str, self.choices))} 之一"
+
+            def check_choice(value: Any) -> Any:
+                if value not in allowed:
+                    raise ArgumentError(choices_message, constraint=True)
+                return value
+
+            checks.append(check_choice)
+
+        if self.minimum is not None or self.maximum is not None:
+            minimum, maximum = self.minimum, self.maximum
+
+            def check_range(value: Any) -> Any:
+                if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+                    low = "" if minimum is None else f"{minimum}"
+                    high = "" if maximum is None else f"{maximum}"
+                    raise ArgumentError(f"参数 {name} 必须在 [{low}, {high}] 范围内", constraint=True)
+                return value
+
+            checks.append(check_range)
+        if self.min_length is not None:
+            min_length = self.min_length
+
+            def check_length(value: Any) -> Any:
+                if len(value) < min_length:
+                    raise ArgumentError(f"参数 {name} 长度不能小于 {min_length}", constraint=True)
+                return value
+
+            checks.append(check_length)
+
+        if not checks:
+            return check_type
+
+        def check(value: Any) -> Any:
+            value = check_type(value)
+            for step in checks:
+                value = step(value)
+            return value
+
+        return check
+
+
+# 校验通过返回调用处理函数的关键字参数，否则返回错误结果
+Validator = Callable[[Dict[str, Any]], Union[Dict[str, Any], CallToolResult]]
+
+
+def compile_validator(params: Sequence[Param]) -> Validator:
+    """把参数声明编译成一个校验函数，未声明的参数被忽略"""
+    compiled = tuple((param.name, param.compile(), param.required, param.default, param.error) for param in params)
+    missing = {param.name: invalid_argument(f"缺少必填参数 {param.name}") for param in params if param.required}
+
+    def validate(arguments: Dict[str, Any]) -> Union[Dict[str, Any], CallToolResult]:
+        kwargs: Dict[str, Any] = {}
+        for name, check, required, default, error in compiled:
+            value = arguments.get(name)
+            if value is None:
+                if required:
+                    return missing[name]
+                kwargs[name] = default
+                continue
+            try:
+                kwargs[name] = check(value)
+            except ArgumentError as e:
+                if e.constraint and error is not None:
+                    return error
+                return invalid_argument(str(e))
+        return kwargs
+
+    return validate
+
+
+class RegisteredTool(NamedTuple):
+    tool: Tool
+    validate: Validator
+    handler: Callable[..., Any]
+    is_async: bool
+
+
+class ToolRegistry:
+    """
+    声明式工具注册表
+
+    用 ``@registry.tool(...)`` 注册处理函数时，由参数声明生成 inputSchema 并编译校验函数；
+    调用时按工具名查字典分发，工具数量增加不会增加单次调用的开销。
+    声明了 ``output_schema`` 的工具，成功时必须返回带 structuredContent 的结果，失败时返回 isError 结果。
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, RegisteredTool] = {}
+        self._list_result: Optional[ListToolsResult] = None
+
+    def tool(
+        self,
+        name: str,
+        description: str,
+        *params: Param,
+        output_schema: Optional[Dict[str, Any]] = None,
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """注册工具的装饰器，处理函数以关键字参数接收校验后的参数，可以是同步或异步函数"""
+
+        def decorator(handler: Callable[..., Any]) -> Callable[..., Any]:
+            if name in self._tools:
+                raise ValueError(f"工具已注册: {name}")
+            input_schema: Dict[str, Any] = {
+                "type": "object",
+                "properties": {param.name: param.schema() for param in params},
+            }
+            required = [param.name for param in params if param.required]
+            if required:
+                input_schema["required"] = required
+            tool = Tool(name=name, description=description, inputSchema=input_schema, outputSchema=output_schema)
+            self._tools[name] = RegisteredTool(
+                tool, compile_validator(params), handler, inspect.iscoroutinefunction(handler)
+            )
+            self._list_result = None
+            return handler
+
+        return decorator
+
+    def get(self, name: str) -> Optional[RegisteredTool]:
+        return self._tools.get(name)
+
+    @property
+    def names(self) -> FrozenSet[str]:
+        return frozenset(self._tools)
+
+    def list_tools_result(self) -> ListToolsResult:
+        """tools/list 的结果，注册表变化前一直复用同一个对象"""
+        if self._list_result is None:
+            self._list_result = ListToolsResult(tools=[entry.tool for entry in self._tools.values()])
+        return self._list_result
+
+    async def call(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
+        """校验参数并调用工具"""
+        entry = self._tools.get(name)
+        if entry is None:
+            raise ValueError(f"未知工具: {name}")
+        kwargs = entry.validate(arguments)
+        if isinstance(kwargs, CallToolResult):
+            return kwargs
+        result = entry.handler(**kwargs)
+        if entry.is_async:
+            result = await result
+        return result
@@ -0,0 +1,207 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from sessions import session_digest
+
+# ASGI scope 中保存当前请求 Trace 的键，MCP 处理函数通过 request_context.request.scope 取回
+TRACE_SCOPE_KEY = "hello_mcp.trace"
+# 待写出的 trace 队列容量，满了直接丢弃
+QUEUE_SIZE = 10_000
+# 后台线程每次 os.write 最多写出的 trace 行数
+WRITE_BATCH = 256
+
+# OTLP 的 SpanKind
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _span_id() -> str:
+    return os.urandom(8).hex()
+
+
+class Trace:
+    """一次 HTTP 请求的计时数据，请求结束后转换成 OTLP span"""
+
+    __slots__ = ("trace_id", "start_ns", "response_start_ns", "end_ns", "status", "handlers")
+
+    def __init__(self, start_ns: int):
+        self.trace_id = os.urandom(16).hex()
+        self.start_ns = start_ns
+        self.response_start_ns: Optional[int] = None
+        self.end_ns: Optional[int] = None
+        self.status: Optional[int] = None
+        # (span 名称, 开始时间, 结束时间, 属性)
+        self.handlers: List[Tuple[str, int, int, Dict[str, Any]]] = []
+
+    def record_handler(
+        self, name: str, start_ns: int, end_ns: int, attributes: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """记录 MCP 处理函数的执行区间"""
+        self.handlers.append((name, start_ns, end_ns, attributes or {}))
+
+
+def request_trace(request: Optional[Request]) -> Optional[Trace]:
+    """取出 MCP 请求对应的 Trace，未开启追踪或未被采样时返回 None"""
+    if request is None:
+        return None
+    return request.scope.get(TRACE_SCOPE_KEY)
+
+
+class Tracer:
+    """
+    按请求记录分阶段耗时，以 OTLP/JSON 格式写入本地文件
+
+    每个请求生成一行 ``ExportTraceServiceRequest`` JSON（OpenTelemetry Collector 的 otlpjsonfile 接收器可以直接读取），
+    包含以下 span：
+    - 根 span：ASGI 层收到请求到最后一个响应体发出
+    - mcp.dispatch：收到请求到处理函数开始执行，即请求体解析、会话路由和消息投递
+    - 处理函数（如 ``tools/call get_element``）
+    - mcp.response：处理函数结束到最后一个响应体发出，即序列化和 SSE 写出
+    写文件在后台线程进行，事件循环只把数据放入队列。
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, service_name: str = "mcp-server"):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.resource = {"attributes": [_attribute("service.name", service_name)]}
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(QUEUE_SIZE)
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+        self._writer.start()
+
+    def wrap(self, app: ASGIApp) -> ASGIApp:
+        """包装 MCP 端点，为被采样的请求创建 Trace"""
+
+        async def traced(scope: Scope, receive: Receive, send: Send) -> None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                await app(scope, receive, send)
+                return
+
+            trace = Trace(time.time_ns())
+            scope[TRACE_SCOPE_KEY] = trace
+
+            async def tracing_send(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    trace.status = message["status"]
+                    trace.response_start_ns = time.time_ns()
+                await send(message)
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    trace.end_ns = time.time_ns()
+
+            try:
+                await app(scope, receive, tracing_send)
+            finally:
+                if trace.end_ns is None:
+                    trace.end_ns = time.time_ns()
+                self._export(trace, scope)
+
+        return traced
+
+    def _export(self, trace: Trace, scope: Scope) -> None:
+        root_id = _span_id()
+        attributes = [
+            _attribute("http.request.method", scope["method"]),
+            _attribute("url.path", scope["path"]),
+        ]
+        if trace.status is not None:
+            attributes.append(_attribute("http.response.status_code", trace.status))
+        for name, value in scope["headers"]:
+            if name == b"mcp-session-id":
+                # 会话 ID 相当于凭据，trace 文件中只记录摘要
+                attributes.append(_attribute("mcp.session.id", session_digest(value.decode("latin-1"))))
+                break
+        root: Dict[str, Any] = {
+            "traceId": trace.trace_id,
+            "spanId": root_id,
+            "name": f"{scope['method']} {scope['path']}",
+            "kind": SPAN_KIND_SERVER,
+            "startTimeUnixNano": str(trace.start_ns),
+            "endTimeUnixNano": str(trace.end_ns),
+            "attributes": attributes,
+            "status": {"code": 2 if trace.status is not None and trace.status >= 500 else 0},
+        }
+        if trace.response_start_ns is not None:
+            root["events"] = [{"timeUnixNano": str(trace.response_start_ns), "name": "http.response.start"}]
+        spans = [root]
+
+        def child(name: str, start_ns: int, end_ns: int, extra: Optional[Dict[str, Any]] = None) -> None:
+            spans.append(
+                {
+                    "traceId": trace.trace_id,
+                    "spanId": _span_id(),
+                    "parentSpanId": root_id,
+                    "name": name,
+                    "kind": SPAN_KIND_INTERNAL,
+                    "startTimeUnixNano": str(start_ns),
+                    "endTimeUnixNano": str(end_ns),
+                    "attributes": [_attribute(key, value) for key, value in (extra or {}).items()],
+                }
+            )
+
+        if trace.handlers:
+            first_start = min(start for _, start, _, _ in trace.handlers)
+            last_end = max(end for _, _, end, _ in trace.handlers)
+            child("mcp.dispatch", trace.start_ns, first_start)
+            for name, start_ns, end_ns, extra in trace.handlers:
+                child(name, start_ns, end_ns, extra)
+            child("mcp.response", last_end, max(last_end, trace.end_ns))
+
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": self.resource,
+                    "scopeSpans": [{"scope": {"name": "hello-mcp"}, "spans": spans}],
+                }
+            ]
+        }
+        try:
+            self._queue.put_nowait(payload)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        # 多 worker 共用一个文件时，O_APPEND 下每次 os.write 原子地追加到文件末尾，
+        # 每次只写完整的行，不同进程的输出不会在行内交错
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while True:
+                payload = self._queue.get()
+                # 队列暂时空了再写出，高负载时一次最多写出 WRITE_BATCH 行
+                lines: List[str] = []
+                while payload is not None:
+                    lines.append(json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    if len(lines) >= WRITE_BATCH:
+                        break
+                    try:
+                        payload = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if lines:
+                    os.write(fd, "".join(lines).encode("utf-8"))
+                if payload is None:
+                    break
+        finally:
+            os.close(fd)
+
+    def close(self) -> None:
+        """写完队列中剩余的 trace 后停止后台线程"""
+        self._queue.put(None)
+        self._writer.join(timeout=5)